@@ -7,9 +7,13 @@ import threading
 import pandas as pd
 import tkinter as tk
 from PIL import Image, ImageTk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 from src.optimizer import Optimizer
-from src.data_processing import load_data, validate_data, save_results
+from src.profiling import MemoryProfiler
+from src.metrics import RunMetrics, MetricsServer
+from src.pipeline import StagePipeline
+from src.decomposition import DecompositionOptimizer, LARGE_INSTANCE_THRESHOLD
+from src.data_processing import load_data, validate_data, save_results, load_assignment, write_truck_report
 from src.visualization import visualize_histogram, visualize_fitness, leftover_histogram
 
 base_dir = os.path.abspath(".")  
@@ -18,8 +22,41 @@ sys.path.append(base_dir)
 DATA_DIR = os.path.join(base_dir, "data", 'to_process')
 RESULTS_DIR = os.path.join(base_dir, "results")
 EXPECTED_HEADERS = ["Paket_id", "Vikt", "Förtjänst", "Deadline"]
+CHECKPOINT_NAME = "checkpoint.npz"
+# Antal paketrader per sida i resultatfönstret
+RESULTS_PAGE_SIZE = 500
 generations = 200
 population_size = 100
+# Tak i sekunder för optimeringen så att nattkörningen hinner bli klar innan lastning, None = ingen gräns
+time_limit = None
+# Minnesmätning med tracemalloc, gör körningen långsammare så den är avstängd som standard
+profile_memory = False
+# Steady-state GA istället för generationsloopen, budgeten blir generations * population_size evalueringar
+steady_state = False
+# Flera filer i to_process körs överlappande: inläsning, GA och skrivning av resultat i var sin tråd
+pipelined = True
+# Antal färdiginlästa filer (eller färdiga resultat) som får vänta mellan stegen
+pipeline_queue_size = 1
+# Katalog för node-exporters textfile collector och port för live-metrics under körningen, None = av
+metrics_textfile_dir = None
+metrics_port = None
+# Live-endpointen delas av alla körningar i processen, startas första gången den behövs
+metrics_server = None
+metrics_server_lock = threading.Lock()
+# Resultatmappar för körningar som pågår, så att t.ex. schemat och Run Now inte återupptar varandras checkpoints
+active_result_dirs = set()
+active_result_dirs_lock = threading.Lock()
+
+def get_metrics_server():
+    """Starta /metrics-endpointen en gång för hela processen om metrics_port är satt, annars None."""
+    global metrics_server
+    with metrics_server_lock:
+        if metrics_port and metrics_server is None:
+            try:
+                metrics_server = MetricsServer(metrics_port)
+            except OSError as e:
+                print(f"Could not start metrics endpoint on port {metrics_port}: {e}")
+        return metrics_server
 
 def check_file(file_path):
     """Kontrollera om filen är en CSV och har rätt format."""
@@ -38,8 +75,177 @@ def check_file(file_path):
     print(f"File {file_path} is valid.")
     return True
 
+def find_checkpoint(optimizer):
+    """Leta efter en avbruten körning av samma lager i results. Returnerar (run_id, checkpoint) eller None.
+
+    Checkpoints från körningar som pågår i den här processen (active_result_dirs) räknas inte som avbrutna.
+    """
+    checksum = optimizer.package_checksum()
+    for folder in os.listdir(RESULTS_DIR):
+        checkpoint_file = os.path.join(RESULTS_DIR, folder, CHECKPOINT_NAME)
+        if not os.path.exists(checkpoint_file) or os.path.dirname(checkpoint_file) in active_result_dirs:
+            continue
+        try:
+            state = Optimizer.load_checkpoint(checkpoint_file)["state"]
+        except Exception as e:
+            print(f"Ignoring unreadable checkpoint {checkpoint_file}: {e}")
+            continue
+        if state["package_checksum"] == checksum:
+            return state["run_id"], checkpoint_file
+    return None
+
+class FileJob:
+    """En fil på väg genom stegen load, optimize och write."""
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.run_id = random.randint(1, 9999)
+        self.result_dir = os.path.join(RESULTS_DIR, f"run_{self.run_id}")
+        self.log_file = os.path.join(base_dir, "logs", f"optimization_{self.run_id}.log")
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+
+        self.log_window = create_log_window(generations * population_size if steady_state else generations)
+        self.profiler = MemoryProfiler() if profile_memory else None
+        self.metrics = RunMetrics(self.run_id)
+        self.packages = None
+        self.optimizer = None
+        self.stats = None
+        self.use_steady_state = False
+
+def load_stage(job):
+    """Läs in och validera filen."""
+    log_window, profiler, metrics = job.log_window, job.profiler, job.metrics
+    try:
+        load_start = time.perf_counter()
+        if profiler:
+            with profiler.phase("load_data"):
+                packages = load_data(job.file_path)
+        else:
+            packages = load_data(job.file_path)
+        valid, message = validate_data(packages)
+        if not valid:
+            log_window.append_log(f"Validation failed: {message}")
+            finish_job(job)
+            return None
+        metrics.set(load_seconds=time.perf_counter() - load_start)
+        job.packages = packages
+        return job
+    except Exception as e:
+        log_window.append_log(f"Error: {e}")
+        finish_job(job)
+        return None
+
+def optimize_stage(job):
+    """Kör optimeringen för en inläst fil."""
+    log_window, profiler, metrics = job.log_window, job.profiler, job.metrics
+    try:
+        # Stora lager körs i uppdelningsläge istället för som ett enda genom
+        optimizer_class = DecompositionOptimizer if len(job.packages) >= LARGE_INSTANCE_THRESHOLD else Optimizer
+        optimizer = optimizer_class(job.packages, log_file=job.log_file)
+        job.packages = None
+        job.use_steady_state = steady_state and optimizer_class is Optimizer
+
+        # Checkpoints skrivs i resultatmappen, en avbruten körning av samma lager fortsätter där den slutade.
+        # Bara generationsloopen har checkpoints, steady-state läget letar inte efter några
+        checkpoint_kwargs = {}
+        if optimizer_class is Optimizer and not job.use_steady_state:
+            with active_result_dirs_lock:
+                resumable = find_checkpoint(optimizer) if os.path.exists(RESULTS_DIR) else None
+                if resumable:
+                    job.run_id, checkpoint_file = resumable
+                    job.result_dir = os.path.dirname(checkpoint_file)
+                    metrics.run_id = job.run_id
+                    log_window.append_log(f"Found checkpoint for this inventory in {job.result_dir}.\n")
+                active_result_dirs.add(job.result_dir)
+            checkpoint_kwargs = {
+                "checkpoint_file": os.path.join(job.result_dir, CHECKPOINT_NAME),
+                "resume": True,
+            }
+
+        # Live-endpointen visar den fil som optimeras just nu
+        server = get_metrics_server()
+        if server:
+            server.show(metrics)
+        metrics.start_optimize()
+        if job.use_steady_state:
+            stats, best_solution = optimizer.optimize_steady_state(
+                population_size=population_size, max_evaluations=generations * population_size,
+                run_id=job.run_id, log_window=log_window, time_limit=time_limit, profiler=profiler, metrics=metrics,
+            )
+        else:
+            stats, best_solution = optimizer.optimize(
+                population_size=population_size, generations=generations, patience=5, run_id=job.run_id, log_window=log_window,
+                time_limit=time_limit, profiler=profiler, metrics=metrics, **checkpoint_kwargs,
+            )
+        metrics.record_result(optimizer, stats)
+        job.optimizer, job.stats = optimizer, stats
+        return job
+    except Exception as e:
+        log_window.append_log(f"Error: {e}")
+        finish_job(job)
+        return None
+
+def write_stage(job):
+    """Spara resultat, metrics, visualiseringar och logg och öppna resultatfönstret."""
+    log_window, profiler, metrics = job.log_window, job.profiler, job.metrics
+    optimizer, stats, run_id, result_dir = job.optimizer, job.stats, job.run_id, job.result_dir
+    try:
+        metrics.export(result_dir, textfile_dir=metrics_textfile_dir)
+
+        result_file, assignment_file = save_results(optimizer, result_dir, f"run_{run_id}", profiler=profiler)
+        if profiler:
+            profiler.write_report(result_dir)
+
+        def save_visualizations():
+            visualize_fitness(stats, result_dir, x_label="Evaluation" if job.use_steady_state else "Generation")
+            truck_weights = [truck.get_total_weight() for truck in optimizer.trucks]
+            truck_profits = [truck.get_total_profit() for truck in optimizer.trucks]
+            visualize_histogram(truck_weights, truck_profits, result_dir)
+            leftover_histogram(optimizer.trucks, optimizer.packages, result_dir)
+
+        log_window.window.after(0, save_visualizations)
+
+        final_log_file = os.path.join(result_dir, f"run_{run_id}.log")
+        try:
+            os.rename(job.log_file, final_log_file)
+            log_window.append_log(f"Log file moved to: {final_log_file}")
+        except Exception as e:
+            log_window.append_log(f"Failed to move log file: {e}")
+            return None
+
+        log_window.append_log(f"Optimization completed for run_id {run_id}.")
+        log_window.window.after(
+            0, lambda: display_results_window(result_file, assignment_file, result_dir)
+        )
+        return job
+    except Exception as e:
+        log_window.append_log(f"Error: {e}")
+    finally:
+        finish_job(job)
+
+def finish_job(job):
+    """Städa upp efter en fil, både när den är klar och när ett steg har avbrutit den."""
+    log_window = job.log_window
+    with active_result_dirs_lock:
+        active_result_dirs.discard(job.result_dir)
+    if job.profiler:
+        job.profiler.stop()
+    if os.path.exists(job.log_file):
+        try:
+            os.remove(job.log_file)
+            log_window.append_log(f"Original log file deleted: {job.log_file}")
+        except Exception as e:
+            log_window.append_log(f"Failed to delete original log file: {e}")
+
+    log_window.append_log("Closing log window...")
+    log_window.window.after(0, log_window.destroy)
+
 def process_files(file_path=None):
-    """Behandlar vald fil från run_now eller från scheduled_run. Kör optimering och sparar resultat."""
+    """Behandlar vald fil från run_now eller från scheduled_run. Kör optimering och sparar resultat.
+
+    Med flera filer och pipelined = True körs stegen överlappande (se StagePipeline): nästa fil läses in
+    och föregående fils resultat skrivs medan GA:n kör. Annars, och alltid med profile_memory eftersom
+    minnesmätningen kräver att stegen inte överlappar, körs filerna en i taget i en och samma tråd.
+    """
     files_to_process = []
 
     if file_path:
@@ -47,69 +253,37 @@ def process_files(file_path=None):
     else:
         files_to_process = [os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if os.path.isfile(os.path.join(DATA_DIR, f))]
 
+    valid_files = []
     for file_path in files_to_process:
         if not check_file(file_path):
             print(f"Skipping invalid file: {file_path}")
             continue
+        valid_files.append(file_path)
 
-        run_id = random.randint(1, 9999)
-        result_dir = os.path.join(RESULTS_DIR, f"run_{run_id}")
-        os.makedirs(result_dir, exist_ok=True)
-        log_file = os.path.join(base_dir, "logs", f"optimization_{run_id}.log")
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    jobs = [FileJob(file_path) for file_path in valid_files]
 
-        log_window = create_log_window()
+    if pipelined and len(jobs) > 1 and not profile_memory:
+        def pipeline_task():
+            pipeline = StagePipeline(
+                [("load", load_stage), ("optimize", optimize_stage), ("write", write_stage)],
+                queue_size=pipeline_queue_size,
+            )
+            pipeline.run(jobs)
+            for line in pipeline.summary_lines():
+                print(line)
 
-        def optimization_task():
-            try:
-                packages = load_data(file_path)
-                valid, message = validate_data(packages)
-                if not valid:
-                    log_window.append_log(f"Validation failed: {message}")
-                    return
-
-                optimizer = Optimizer(packages, log_file=log_file)
-                stats, best_solution = optimizer.optimize(
-                    population_size=population_size, generations=generations, patience=5, run_id=run_id, log_window=log_window
-                )
-
-                result_file, truck_details_file = save_results(optimizer, result_dir, f"run_{run_id}")
-
-                def save_visualizations():
-                    visualize_fitness(stats, result_dir)
-                    truck_weights = [truck.get_total_weight() for truck in optimizer.trucks]
-                    truck_profits = [truck.get_total_profit() for truck in optimizer.trucks]
-                    visualize_histogram(truck_weights, truck_profits, result_dir)
-                    leftover_histogram(optimizer.trucks, optimizer.packages, result_dir)
-
-                log_window.window.after(0, save_visualizations)
-
-                final_log_file = os.path.join(result_dir, f"run_{run_id}.log")
-                try:
-                    os.rename(log_file, final_log_file)
-                    log_window.append_log(f"Log file moved to: {final_log_file}")
-                except Exception as e:
-                    log_window.append_log(f"Failed to move log file: {e}")
-                    return
-
-                log_window.append_log(f"Optimization completed for run_id {run_id}.")
-                log_window.window.after(
-                    0, lambda: display_results_window(result_file, truck_details_file, result_dir)
-                )
-            except Exception as e:
-                log_window.append_log(f"Error: {e}")
-            finally:
-                if os.path.exists(log_file):
-                    try:
-                        os.remove(log_file)
-                        log_window.append_log(f"Original log file deleted: {log_file}")
-                    except Exception as e:
-                        log_window.append_log(f"Failed to delete original log file: {e}")
-
-                log_window.append_log("Closing log window...")
-                log_window.window.after(0, log_window.destroy)
-
-        threading.Thread(target=optimization_task).start()
+        threading.Thread(target=pipeline_task).start()
+        return
+
+    def optimization_task():
+        for job in jobs:
+            job = load_stage(job)
+            if job:
+                job = optimize_stage(job)
+            if job:
+                write_stage(job)
+
+    threading.Thread(target=optimization_task).start()
 
 def schedule_run():
     """En schemalagd körning som ska köras varje dag vid 05:00"""
@@ -128,18 +302,16 @@ def schedule_run():
             print("No files available in the data directory.")
             continue
 
-        file_to_process = files[0]  
-        print(f"Scheduled run started for: {file_to_process}")
-        process_files(file_to_process)
+        print(f"Scheduled run started for {len(files)} file(s) in: {DATA_DIR}")
+        process_files()
 
 def run_now():
-    """Kör optimering direkt för vald fil eller första fil i to_process mappen."""
+    """Kör optimering direkt för alla filer i to_process mappen, eller för en vald fil om mappen är tom."""
     files = [os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if os.path.isfile(os.path.join(DATA_DIR, f))]
 
     if files:
-        file_to_process = files[0]
-        print(f"Processing file from to_process: {file_to_process}")
-        process_files(file_to_process)
+        print(f"Processing {len(files)} file(s) from to_process: {DATA_DIR}")
+        process_files()
     else:
         file_path = filedialog.askopenfilename(initialdir=os.path.join(base_dir, 'data'), title="Select a File")
         if not file_path or not os.path.isfile(file_path):
@@ -189,8 +361,12 @@ def create_log_window(total_generations=generations):
 
     return LogWindow()
 
-def display_results_window(result_file, truck_details_file, result_dir):
-    """Öppnar separata fönster för att visa resultat och histogram."""
+def display_results_window(result_file, assignment_file, result_dir):
+    """Öppnar separata fönster för att visa resultat och histogram.
+
+    Tilldelningen visas sida för sida i en tabell så att fönstret öppnas direkt oavsett antal paket.
+    Äldre körningar som bara har _truck_details.txt visas som text.
+    """
     def read_file_content(file_path):
         with open(file_path, "r", encoding="utf-8") as file:
             return file.read()
@@ -199,15 +375,49 @@ def display_results_window(result_file, truck_details_file, result_dir):
     result_window.title("Optimization Results")
     result_window.geometry("800x600+100+100") 
 
-    text_area = tk.Text(result_window, wrap=tk.WORD, font=("Helvetica", 10))
-    text_area.pack(expand=1, fill=tk.BOTH, side=tk.LEFT)
+    text_area = tk.Text(result_window, wrap=tk.WORD, font=("Helvetica", 10), height=16)
+    text_area.pack(fill=tk.X, side=tk.TOP)
+    text_area.insert(tk.END, f"--- Results ---\n\n{read_file_content(result_file)}")
 
-    result_content = (
-        f"--- Results ---\n\n{read_file_content(result_file)}\n\n"
-        f"--- Truck Details ---\n\n{read_file_content(truck_details_file)}"
-    )
-    text_area.insert(tk.END, result_content)
-    text_area.config(state=tk.DISABLED)
+    if assignment_file.endswith(".txt"):
+        text_area.pack(expand=1, fill=tk.BOTH)
+        text_area.insert(tk.END, f"\n\n--- Truck Details ---\n\n{read_file_content(assignment_file)}")
+        text_area.config(state=tk.DISABLED)
+    else:
+        text_area.config(state=tk.DISABLED)
+        table = load_assignment(assignment_file)
+        pages = max(1, -(-len(table) // RESULTS_PAGE_SIZE))
+        page = 0
+
+        tree = ttk.Treeview(result_window, columns=list(table.columns), show="headings")
+        for column in table.columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=110, anchor=tk.W)
+
+        controls = tk.Frame(result_window)
+        controls.pack(fill=tk.X, side=tk.BOTTOM)
+        tree.pack(expand=1, fill=tk.BOTH)
+        page_label = tk.Label(controls, font=("Helvetica", 10))
+
+        def show_page(new_page):
+            nonlocal page
+            page = min(max(new_page, 0), pages - 1)
+            tree.delete(*tree.get_children())
+            rows = table.iloc[page * RESULTS_PAGE_SIZE:(page + 1) * RESULTS_PAGE_SIZE]
+            for row in rows.itertuples(index=False):
+                tree.insert("", tk.END, values=row)
+            page_label.config(text=f"Page {page + 1}/{pages} ({len(table)} packages)")
+
+        def export_report():
+            report_file = assignment_file.replace("_assignment.csv", "_truck_details.txt")
+            write_truck_report(table, report_file)
+            messagebox.showinfo("Report Saved", f"Truck details saved: {report_file}")
+
+        tk.Button(controls, text="< Prev", command=lambda: show_page(page - 1)).pack(side=tk.LEFT, padx=5, pady=5)
+        tk.Button(controls, text="Next >", command=lambda: show_page(page + 1)).pack(side=tk.LEFT, padx=5, pady=5)
+        page_label.pack(side=tk.LEFT, padx=10)
+        tk.Button(controls, text="Export text report", command=export_report).pack(side=tk.RIGHT, padx=5, pady=5)
+        show_page(0)
 
     if result_dir:
         truck_dist_path = os.path.join(result_dir, "truck_distribution.png")
@@ -280,10 +490,14 @@ def view_results():
         result_dir = os.path.join(RESULTS_DIR, folder_name)
 
         result_file = os.path.join(result_dir, f"{folder_name}_results.txt")
+        assignment_file = os.path.join(result_dir, f"{folder_name}_assignment.csv")
         truck_details_file = os.path.join(result_dir, f"{folder_name}_truck_details.txt")
+        if not os.path.exists(assignment_file):
+            # Äldre körningar har bara textrapporten
+            assignment_file = truck_details_file
 
-        if os.path.exists(result_file) and os.path.exists(truck_details_file):
-            display_results_window(result_file, truck_details_file, result_dir)
+        if os.path.exists(result_file) and os.path.exists(assignment_file):
+            display_results_window(result_file, assignment_file, result_dir)
         else:
             messagebox.showerror("Error", "Result files not found in the selected folder.")
 
@@ -1,22 +1,44 @@
 import pandas as pd
+import numpy as np
 import os
 from src.objects.package import Package
 from src.seeds import seed_packages
 
+try:
+    import pyarrow
+except ImportError:
+    # Parquet är valfritt, utan pyarrow sparas tabellen som .npz istället
+    pyarrow = None
+
 output_file = 'data/lagerstatus.csv'
 
+def _packages_from_frame(df):
+    """Bygg Package objekt kolumnvis, iterrows blir för långsamt för lagerfiler med miljontals rader."""
+    return [
+        Package(package_id, weight, profit, deadline)
+        for package_id, weight, profit, deadline in zip(
+            df['Paket_id'].tolist(), df['Vikt'].tolist(), df['Förtjänst'].tolist(), df['Deadline'].tolist()
+        )
+    ]
+
 def load_data(file_path):
     """Läs in lagerstatus.csv och returnera en lista av Package objekt"""
+    if str(file_path).endswith('.npy'):
+        # Binärformatet från seed_packages, läses via mmap istället för att parsas
+        table = np.load(file_path, mmap_mode='r')
+        df = pd.DataFrame({'Paket_id': table['id'], 'Vikt': table['weight'],
+                           'Förtjänst': table['profit'], 'Deadline': table['deadline']})
+        return _packages_from_frame(df)
     try:
         df = pd.read_csv(file_path)
-        packages = [Package(row['Paket_id'], row['Vikt'], row['Förtjänst'], row['Deadline']) for index, row in df.iterrows()]
+        packages = _packages_from_frame(df)
         return packages
     except FileNotFoundError:
         print(f'File not found: {file_path}')
         print('Seeding data...')
         seed_packages(n_iter=100, target_path=output_file)
         df = pd.read_csv(file_path)
-        packages = [Package(row['Paket_id'], row['Vikt'], row['Förtjänst'], row['Deadline']) for index, row in df.iterrows()]
+        packages = _packages_from_frame(df)
         return packages
 
 def validate_data(packages):
@@ -27,7 +49,69 @@ def validate_data(packages):
         return False, "Weight must be greater than 0"
     return True, "Validation done"
 
-def save_results(optimizer, result_dir, timestamp):
+ASSIGNMENT_COLUMNS = ['Truck_id', 'Paket_id', 'Vikt', 'Förtjänst', 'Deadline', 'Straffavgift']
+
+def assignment_table(optimizer):
+    """Tilldelningen som en tabell med en rad per levererat paket, i bilarnas ordning."""
+    rows = [(truck.id, p) for truck in optimizer.trucks for p in truck.packages]
+    return pd.DataFrame({
+        'Truck_id': [truck_id for truck_id, _ in rows],
+        'Paket_id': [p.id for _, p in rows],
+        'Vikt': [p.weight for _, p in rows],
+        'Förtjänst': [p.profit for _, p in rows],
+        'Deadline': [p.deadline for _, p in rows],
+        'Straffavgift': [p.calculate_penalty() for _, p in rows],
+    }, columns=ASSIGNMENT_COLUMNS)
+
+def save_assignment(table, result_dir, timestamp):
+    """Skriv tilldelningen kolumnvis i ett svep: CSV samt Parquet (med pyarrow) eller .npz. Returnerar CSV-filen."""
+    assignment_file = os.path.join(result_dir, f"{timestamp}_assignment.csv")
+    table.to_csv(assignment_file, index=False, lineterminator='\n')
+    if pyarrow is not None:
+        table.to_parquet(os.path.join(result_dir, f"{timestamp}_assignment.parquet"), index=False)
+    else:
+        np.savez_compressed(
+            os.path.join(result_dir, f"{timestamp}_assignment.npz"),
+            **{column: table[column].to_numpy(dtype=str if column == 'Truck_id' else None) for column in ASSIGNMENT_COLUMNS},
+        )
+    return assignment_file
+
+def load_assignment(assignment_file):
+    """Läs tilldelningen, snabbaste formatet som finns bredvid CSV-filen används först."""
+    base = os.path.splitext(assignment_file)[0]
+    if pyarrow is not None and os.path.exists(base + '.parquet'):
+        return pd.read_parquet(base + '.parquet')
+    if os.path.exists(base + '.npz'):
+        with np.load(base + '.npz') as columns:
+            return pd.DataFrame({column: columns[column] for column in ASSIGNMENT_COLUMNS})
+    return pd.read_csv(assignment_file)
+
+def write_truck_report(table, report_file):
+    """Skapa den gamla textrapporten per lastbil (samma format som export_truck_details) från tabellen.
+
+    Tabellen har bara levererade paket, så bilar utan paket kommer inte med i rapporten.
+    """
+    lines = []
+    for truck_id, truck in table.groupby('Truck_id', sort=False):
+        lines.append(f"Truck ID: {truck_id}")
+        lines.append(f"Total Weight: {truck['Vikt'].sum()}")
+        lines.append(f"Total Profit: {(truck['Förtjänst'] + truck['Straffavgift']).sum()}")
+        lines.append(f"Total Penalty: {truck['Straffavgift'].sum()}")
+        lines.append(f"Packages: {len(truck)}")
+        lines.append(f"{'Package ID':<15}{'Weight':<15}{'Profit':<15}{'Deadline':<15}")
+        lines.append("-" * 60)
+        lines.extend(
+            f"{package_id:<15}{weight:<15.2f}{profit:<15.2f}{deadline:<15}"
+            for package_id, weight, profit, deadline in zip(
+                truck['Paket_id'].tolist(), truck['Vikt'].tolist(), truck['Förtjänst'].tolist(), truck['Deadline'].tolist()
+            )
+        )
+        lines.append("")
+    with open(report_file, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+    return report_file
+
+def save_results(optimizer, result_dir, timestamp, profiler=None):
     """Spara resultat från optimering till filer i resultat mappen."""
     os.makedirs(result_dir, exist_ok=True)
 
@@ -52,14 +136,20 @@ def save_results(optimizer, result_dir, timestamp):
         file.write(f"Totala Straffavgifter (levererade paket): {total_penalty}\n")
         file.write(f"Total förtjänst för levererade paket: "
                    f"{total_profit + total_penalty}\n")
+        if getattr(optimizer, "optimality_gap", None) is not None:
+            file.write(f"Övre gräns (levererat värde): {optimizer.upper_bound:.2f}\n")
+            file.write(f"Optimalitetsgap: {optimizer.optimality_gap:.2%}\n")
+        if profiler:
+            for line in profiler.summary_lines():
+                file.write(line + "\n")
 
-    truck_details_file = os.path.join(result_dir, f"{timestamp}_truck_details.txt")
-    optimizer.export_truck_details(truck_details_file)
+    # Textrapporten per lastbil skapas bara vid behov från tabellen med write_truck_report
+    assignment_file = save_assignment(assignment_table(optimizer), result_dir, timestamp)
 
     print(f"Results saved: {result_file}")
-    print(f"Truck details saved: {truck_details_file}")
+    print(f"Assignment saved: {assignment_file}")
 
-    return result_file, truck_details_file
+    return result_file, assignment_file
 
 if __name__ == '__main__':
     packages = load_data('data/lagerstatus.csv')
@@ -0,0 +1,143 @@
+import os
+import random
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.optimizer import Optimizer, log_file
+from src.shared_data import SharedPackageData, package_columns
+
+# Från ungefär så här många paket används uppdelningsläget istället för ett enda GA-genom
+LARGE_INSTANCE_THRESHOLD = 200_000
+
+def _solve_part(handle, rows, num_trucks, max_capacity, ga_params, seed, log_file, run_id):
+    """Löser ett delproblem i en workerprocess och returnerar kandidatrader per bil."""
+    random.seed(seed)
+    with SharedPackageData.attach(handle) as shared:
+        packages = shared.to_packages(rows)
+    optimizer = Optimizer(packages, max_trucks=num_trucks, max_capacity=max_capacity, log_file=log_file)
+    stats, best_solution = optimizer.optimize(run_id=run_id, **ga_params)
+    row_of = {p: row for p, row in zip(packages, rows.tolist())}
+    return stats, [[row_of[p] for p in truck] for truck in best_solution], optimizer.evaluations
+
+class DecompositionOptimizer(Optimizer):
+    """Optimizer för mycket stora lager: beskär till kandidater, löser delproblem parallellt och syr ihop dem."""
+    def __init__(self, packages, max_trucks=10, max_capacity=800, log_file=log_file,
+                 candidate_factor=3.0, num_parts=None, max_workers=None):
+        super().__init__(packages, max_trucks=max_trucks, max_capacity=max_capacity, log_file=log_file)
+        self.candidate_factor = candidate_factor
+        self.num_parts = max(1, min(num_parts or os.cpu_count() or 1, max_trucks))
+        self.max_workers = max_workers
+        self.upper_bound = None
+        self.optimality_gap = None
+
+    def select_candidates(self):
+        """Ta de lönsamma paketen i samma ordning som __init__ (förtjänst per vikt, deadline)
+        tills de väger candidate_factor gånger hela flottans kapacitet."""
+        profitable = np.flatnonzero(self.values > 0)
+        budget = self.candidate_factor * self.max_trucks * self.capacity_units
+        cumulative = np.cumsum(self.weight_units[profitable])
+        return profitable[:np.searchsorted(cumulative, budget) + 1]
+
+    def split_parts(self, num_candidates):
+        """Dela bilarna på delproblemen och dela ut kandidaterna i tur och ordning i proportion till antalet bilar."""
+        trucks = [self.max_trucks // self.num_parts + (1 if p < self.max_trucks % self.num_parts else 0)
+                  for p in range(self.num_parts)]
+        pattern = np.repeat(np.arange(self.num_parts), trucks)
+        owner = pattern[np.arange(num_candidates) % len(pattern)]
+        return [(trucks[p], np.flatnonzero(owner == p)) for p in range(self.num_parts)]
+
+    def value_bound(self):
+        """Övre gräns för levererat värde: LP-relaxationen av knapsack med hela flottans kapacitet."""
+        profitable = np.flatnonzero(self.values > 0)
+        order = profitable[np.argsort(-(self.values / self.weight_units)[profitable], kind="stable")]
+        capacity = self.max_trucks * self.capacity_units
+        cumulative = np.cumsum(self.weight_units[order])
+        taken = int(np.searchsorted(cumulative, capacity, side="right"))
+        bound = float(self.values[order[:taken]].sum())
+        if taken < len(order):
+            used = cumulative[taken - 1] if taken else 0
+            bound += self.values[order[taken]] * (capacity - used) / self.weight_units[order[taken]]
+        return bound
+
+    def _merge_stats(self, part_stats, candidates):
+        """Summera delproblemens fitness per generation till fitness för hela lagret."""
+        not_candidate = np.ones(len(self.packages), dtype=bool)
+        not_candidate[candidates] = False
+        outside_penalty = sum(p.calculate_penalty() for p, skip in zip(self.packages, not_candidate.tolist()) if skip)
+
+        length = max(len(stats) for stats in part_stats)
+        merged = []
+        for generation in range(length):
+            rows = [stats[min(generation, len(stats) - 1)] for stats in part_stats]
+            merged.append((
+                generation,
+                sum(row[1] for row in rows) - outside_penalty,
+                sum(row[2] for row in rows) - outside_penalty,
+            ))
+        return merged
+
+    def optimize(self, run_id=None, log_window=None, profiler=None, metrics=None, **ga_params):
+        """Uppdelningsläge: kandidater, parallella delproblem, ihopsyning, girig påfyllning och optimalitetsgap.
+
+        Profiler och metrics gäller bara huvudprocessen och skickas inte vidare till delproblemen.
+        """
+        if run_id is None:
+            run_id = random.randint(1, 9999)
+        self.evaluations = 0
+
+        candidates = self.select_candidates()
+        parts = self.split_parts(len(candidates))
+        offsets = np.cumsum([0] + [num_trucks for num_trucks, _ in parts])
+        table = package_columns([self.packages[i] for i in candidates.tolist()])
+        assignment = np.full(len(self.packages), -1, dtype=np.int64)
+        part_stats = []
+
+        # Appen kör detta från en tråd medan Tk och andra trådar är igång, och fork i en flertrådad process
+        # kan låsa sig. Workers behöver bara handle och rader, så de startas via forkserver (spawn på Windows)
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(start_method)
+        with SharedPackageData.publish(table) as shared, \
+                ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as executor:
+            futures = {
+                executor.submit(
+                    _solve_part, shared.handle, rows, num_trucks, self.max_capacity, ga_params,
+                    random.randint(0, 2**31 - 1), self.log_file, f"{run_id}.{part + 1}",
+                ): part
+                for part, (num_trucks, rows) in enumerate(parts)
+            }
+            for future in as_completed(futures):
+                part = futures[future]
+                stats, trucks, evaluations = future.result()
+                self.evaluations += evaluations
+                for truck_index, rows in enumerate(trucks):
+                    assignment[candidates[rows]] = offsets[part] + truck_index
+                part_stats.append(stats)
+                if log_window:
+                    log_window.append_log(f"Part {part + 1}/{len(parts)} done ({len(parts[part][1])} candidates).\n")
+
+        # Fyll det som blev över i bilarna från hela lagret, inte bara kandidaterna
+        self.repair(assignment)
+        best_solution = self.to_individual(assignment)
+        self.apply_solution(best_solution)
+
+        stats = self._merge_stats(part_stats, candidates)
+        final_fitness = self.fitness(best_solution)
+        stats.append((len(stats), final_fitness, final_fitness))
+        if metrics:
+            metrics.observe_generation(len(stats) - 1, final_fitness, final_fitness, self.evaluations)
+
+        self.upper_bound = self.value_bound()
+        delivered_value = float(self.values[assignment >= 0].sum())
+        self.optimality_gap = (self.upper_bound - delivered_value) / self.upper_bound if self.upper_bound > 0 else 0.0
+
+        message = (
+            f"Decomposition run {run_id}: {len(candidates)} of {len(self.packages)} packages as candidates, "
+            f"{len(parts)} parts, delivered value {delivered_value:.2f}, "
+            f"upper bound {self.upper_bound:.2f}, optimality gap {self.optimality_gap:.2%}\n"
+        )
+        with open(self.log_file, "a", encoding="utf-8") as file:
+            file.write(message)
+        if log_window:
+            log_window.append_log(message)
+
+        return stats, best_solution
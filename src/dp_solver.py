@@ -0,0 +1,73 @@
+import random
+import numpy as np
+from src.optimizer import Optimizer, log_file
+
+class DPOptimizer(Optimizer):
+    """Fyller bilarna en i taget med exakt dynamisk programmering (0/1-knapsack) över de paket som är kvar.
+
+    Vikterna räknas i heltalsenheter (0.1 kg), så en bil med 800 kg blir en knapsack med 8000 kapacitetsenheter.
+    Värdet per paket är effective_profit, dvs. förtjänsten med straffavgiften från calculate_penalty inräknad,
+    vilket ger samma målfunktion som fitness i den genetiska algoritmen.
+
+    Varje bil löses över de lediga paketen med högst förtjänst per kg tills de väger candidate_factor gånger
+    bilens kapacitet, så att DP-tabellen inte växer med hela lagret.
+    """
+    def __init__(self, packages, max_trucks=10, max_capacity=800, log_file=log_file, candidate_factor=3.0):
+        super().__init__(packages, max_trucks=max_trucks, max_capacity=max_capacity, log_file=log_file)
+        self.candidate_factor = candidate_factor
+
+    def knapsack_candidates(self, available):
+        """Lediga lönsamma paket i fallande förtjänst per kg tills de väger candidate_factor bilkapaciteter."""
+        order = self.density_order[available[self.density_order]]
+        cumulative = np.cumsum(self.weight_units[order])
+        budget = self.candidate_factor * self.capacity_units
+        return np.sort(order[:np.searchsorted(cumulative, budget) + 1])
+
+    def knapsack(self, candidates):
+        """Exakt knapsack för en bil över candidates, returnerar de valda paketindexen."""
+        units = self.weight_units[candidates].tolist()
+        values = self.values[candidates].tolist()
+        best = np.zeros(self.capacity_units + 1)
+        # Ett val per paket och kapacitet, packat till bitar (1 byte per 8 kapacitetsenheter)
+        keep = np.zeros((len(candidates), (self.capacity_units + 8) // 8), dtype=np.uint8)
+        improves = np.zeros(self.capacity_units + 1, dtype=bool)
+
+        for k, (weight, value) in enumerate(zip(units, values)):
+            with_item = best[:-weight] + value
+            improves[:weight] = False
+            np.greater(with_item, best[weight:], out=improves[weight:])
+            keep[k] = np.packbits(improves)
+            best[weight:] = np.where(improves[weight:], with_item, best[weight:])
+
+        chosen = []
+        capacity = self.capacity_units
+        for k in range(len(candidates) - 1, -1, -1):
+            if keep[k, capacity >> 3] >> (7 - (capacity & 7)) & 1:
+                chosen.append(candidates[k])
+                capacity -= units[k]
+        return chosen
+
+    def optimize(self, run_id=None, log_window=None, **ignored):
+        """Fyll bilarna en efter en med exakt DP. Returnerar (stats, best_solution) precis som GA:n."""
+        if run_id is None:
+            run_id = random.randint(1, 9999)
+
+        assignment = np.full(len(self.packages), -1, dtype=np.int64)
+        stats = []
+        for truck_index in range(self.max_trucks):
+            available = (assignment < 0) & (self.weight_units <= self.capacity_units)
+            candidates = self.knapsack_candidates(available).tolist()
+            assignment[self.knapsack(candidates)] = truck_index
+
+            fitness = self.fitness(self.to_individual(assignment))
+            stats.append((truck_index, fitness, fitness))
+            self.log_progress(truck_index, fitness, fitness, run_id=run_id, log_window=log_window)
+
+        best_solution = self.to_individual(assignment)
+        self.apply_solution(best_solution)
+
+        self.log_progress(-1, fitness, fitness, run_id=run_id, log_window=log_window)
+        if log_window:
+            log_window.append_log(f"Optimization completed for run_id: {run_id}")
+
+        return stats, best_solution
@@ -1,44 +1,139 @@
 import pandas as pd
 import os
 import sys
+import time
+import random
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import matplotlib.pyplot as plt
 from src.objects.package import Package
 from src.optimizer import Optimizer
+from src.dp_solver import DPOptimizer
+from src.shared_data import SharedPackageData
 
 base_dir = os.path.abspath("..")  #
 sys.path.append(base_dir) 
 log_file = os.path.join(base_dir, "logs", "optimization.log")
 
+SWEEP_KEYS = ["population_size", "generations", "patience", "seed"]
+
+def _case_params(case):
+    """Plocka ut parametrarna för ett testfall med samma standardvärden som test_optimizer."""
+    return {
+        "population_size": case.get("population_size", 20),
+        "generations": case.get("generations", 50),
+        "patience": case.get("patience", 5),
+    }
+
+def _run_case(packages, params, log_file=log_file):
+    """Kör optimizer för ett testfall och sammanfatta resultatet som en rad."""
+    start = time.perf_counter()
+    optimizer = Optimizer(packages, max_trucks=10, max_capacity=800, log_file=log_file)
+    stats, best_solution = optimizer.optimize(**params)
+
+    # Samla resultat
+    best_fitness = max(stat[1] for stat in stats)
+    mean_fitness = stats[-1][2]  
+    num_generations = len(stats) 
+    return {
+        **params,
+        "best_fitness": best_fitness,
+        "mean_fitness": mean_fitness,
+        "num_generations": num_generations,
+        "runtime": time.perf_counter() - start,
+    }
+
 def test_optimizer(packages, test_cases):
     """Testa optimizer med olika parametrar och lagra resultaten."""
     results = []
 
     for case in test_cases:
-        population_size = case.get("population_size", 20)
-        generations = case.get("generations", 50)
-        patience = case.get("patience", 5)
+        result = _run_case(packages, _case_params(case))
+        del result["runtime"]
+        results.append(result)
+
+    return pd.DataFrame(results)
 
-        optimizer = Optimizer(packages, max_trucks=10, max_capacity=800, log_file=log_file)
+_worker_packages = None
+_worker_shared = None
+
+def _init_sweep_worker(handle):
+    """Körs en gång per process: kopplar upp mot det delade paketsegmentet och bygger paketen."""
+    global _worker_packages, _worker_shared
+    _worker_shared = SharedPackageData.attach(handle)
+    _worker_packages = _worker_shared.to_packages()
+
+def _sweep_task(params, seed):
+    """En uppgift i svepet: ett testfall med ett givet seed."""
+    random.seed(seed)
+    worker_log = os.path.join(os.path.dirname(log_file), f"sweep_{os.getpid()}.log")
+    result = _run_case(_worker_packages, params, log_file=worker_log)
+    result["seed"] = seed
+    return result
+
+def iter_sweep(packages, test_cases, seeds=(0,), max_workers=None, results_file=None):
+    """Kör testfall och seeds parallellt och ger varje resultatrad så fort den är klar.
+
+    Med results_file sparas varje rad direkt i en CSV, och rader som redan finns där körs inte om.
+    """
+    done = set()
+    if results_file and os.path.exists(results_file):
+        previous = pd.read_csv(results_file)
+        done = {tuple(row) for row in previous[SWEEP_KEYS].itertuples(index=False)}
+
+    tasks = []
+    for case in test_cases:
+        params = _case_params(case)
+        for seed in seeds:
+            if tuple(params.values()) + (seed,) not in done:
+                tasks.append((params, seed))
+    if not tasks:
+        return
+
+    with SharedPackageData.publish(packages) as shared, ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_sweep_worker, initargs=(shared.handle,)
+    ) as executor:
+        futures = [executor.submit(_sweep_task, params, seed) for params, seed in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            if results_file:
+                write_header = not os.path.exists(results_file)
+                pd.DataFrame([result]).to_csv(results_file, mode="a", header=write_header, index=False)
+            yield result
+
+def sweep_optimizer(packages, test_cases, seeds=(0,), max_workers=None, results_file=None, on_result=None):
+    """Parallell version av test_optimizer med flera seeds per testfall, kan återupptas via results_file.
+
+    on_result anropas med hela DataFrame:n hittills efter varje färdig körning.
+    """
+    results = []
+    if results_file and os.path.exists(results_file):
+        results = pd.read_csv(results_file).to_dict("records")
+
+    for result in iter_sweep(packages, test_cases, seeds, max_workers, results_file):
+        results.append(result)
+        if on_result:
+            on_result(pd.DataFrame(results))
+
+    return pd.DataFrame(results)
+
+def compare_engines(packages, population_size=20, generations=50, patience=5):
+    """Jämför GA:n mot DP-motorn på samma lager: fitness, levererat värde och körtid."""
+    results = []
+    for name, engine in (("genetic", Optimizer), ("dp", DPOptimizer)):
+        start = time.perf_counter()
+        optimizer = engine(packages, max_trucks=10, max_capacity=800, log_file=log_file)
         stats, best_solution = optimizer.optimize(
-            population_size=population_size,
-            generations=generations,
-            patience=patience,
+            population_size=population_size, generations=generations, patience=patience
         )
-
-        # Samla resultat
-        best_fitness = max(stat[1] for stat in stats)
-        mean_fitness = stats[-1][2]  
-        num_generations = len(stats) 
+        runtime = time.perf_counter() - start
         results.append({
-            "population_size": population_size,
-            "generations": generations,
-            "patience": patience,
-            "best_fitness": best_fitness,
-            "mean_fitness": mean_fitness,
-            "num_generations": num_generations,
+            "engine": name,
+            "fitness": optimizer.fitness(best_solution),
+            "delivered_profit": sum(truck.get_total_profit() for truck in optimizer.trucks),
+            "delivered_packages": sum(len(truck.packages) for truck in optimizer.trucks),
+            "runtime": runtime,
         })
-
     return pd.DataFrame(results)
 
 def visualize_results(results):
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Namn, typ och beskrivning för varje mätvärde i Prometheus-exporten
+METRICS = {
+    "load_seconds": ("gauge", "Time spent loading and validating the inventory."),
+    "optimize_seconds": ("gauge", "Time spent in Optimizer.optimize."),
+    "generations": ("gauge", "Generations (or steps) run so far."),
+    "fitness_evaluations": ("counter", "Fitness evaluations so far."),
+    "evaluations_per_second": ("gauge", "Fitness evaluations per second during optimize."),
+    "best_fitness": ("gauge", "Best fitness so far."),
+    "mean_fitness": ("gauge", "Mean fitness of the latest population."),
+    "diversity": ("gauge", "Mean pairwise distance between delivered package sets in the latest population."),
+    "duplicates_removed": ("counter", "Duplicate individuals replaced by immigrants."),
+    "leftover_packages": ("gauge", "Packages left in the warehouse after the run."),
+    "leftover_penalty": ("gauge", "Total penalty of the packages left in the warehouse."),
+    "delivered_packages": ("gauge", "Packages loaded on trucks."),
+    "delivered_profit": ("gauge", "Total effective profit of the delivered packages."),
+}
+PREFIX = "delivery_optimizer_"
+
+class RunMetrics:
+    """Mätvärden för en körning, exporteras som JSON och Prometheus-textformat och kan visas live via MetricsServer."""
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.values = {}
+        self.lock = threading.Lock()
+        self.optimize_start = None
+
+    def set(self, **values):
+        with self.lock:
+            self.values.update(values)
+
+    def start_optimize(self):
+        self.optimize_start = time.perf_counter()
+
+    def observe_generation(self, generation, best_fitness, mean_fitness, evaluations):
+        """Uppdateras varje generation från optimize så att live-endpointen visar aktuella värden."""
+        elapsed = time.perf_counter() - self.optimize_start if self.optimize_start else 0.0
+        self.set(
+            generations=generation + 1,
+            best_fitness=float(best_fitness),
+            mean_fitness=float(mean_fitness),
+            fitness_evaluations=evaluations,
+            optimize_seconds=elapsed,
+            evaluations_per_second=evaluations / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def record_result(self, optimizer, stats):
+        """Slutliga värden efter körningen, samma beräkningar som i save_results."""
+        delivered = {p for truck in optimizer.trucks for p in truck.packages}
+        leftover = [p for p in optimizer.packages if p not in delivered]
+        optimize_seconds = time.perf_counter() - self.optimize_start if self.optimize_start else 0.0
+        evaluations = getattr(optimizer, "evaluations", 0)
+        if len(stats[-1]) > 3:
+            self.set(diversity=float(stats[-1][3]))
+        self.set(
+            duplicates_removed=getattr(optimizer, "duplicates_removed", 0),
+            generations=len(stats),
+            best_fitness=float(max(stat[1] for stat in stats)),
+            mean_fitness=float(stats[-1][2]),
+            fitness_evaluations=evaluations,
+            optimize_seconds=optimize_seconds,
+            evaluations_per_second=evaluations / optimize_seconds if optimize_seconds > 0 else 0.0,
+            leftover_packages=len(leftover),
+            leftover_penalty=float(sum(p.calculate_penalty() for p in leftover)),
+            delivered_packages=len(delivered),
+            delivered_profit=float(sum(truck.get_total_profit() for truck in optimizer.trucks)),
+        )
+
+    def to_dict(self):
+        with self.lock:
+            return {"run_id": self.run_id, **self.values}
+
+    def prometheus_text(self):
+        """Mätvärdena i Prometheus text exposition format."""
+        values = self.to_dict()
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            if name not in values:
+                continue
+            lines.append(f"# HELP {PREFIX}{name} {description}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.append(f'{PREFIX}{name}{{run_id="{self.run_id}"}} {values[name]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, result_dir, textfile_dir=None):
+        """Skriv metrics.json och metrics.prom till resultatmappen, och .prom även till node-exporters textfile-katalog."""
+        os.makedirs(result_dir, exist_ok=True)
+        json_file = os.path.join(result_dir, "metrics.json")
+        with open(json_file, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+        targets = [os.path.join(result_dir, "metrics.prom")]
+        if textfile_dir:
+            targets.append(os.path.join(textfile_dir, "delivery_optimizer.prom"))
+        for target in targets:
+            # Textfile collector kan läsa mitt i en skrivning, så filen byts ut atomiskt
+            temp_file = target + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as file:
+                file.write(self.prometheus_text())
+            os.replace(temp_file, target)
+
+        print(f"Metrics saved: {json_file}")
+        return json_file
+
+class MetricsServer:
+    """En lokal HTTP-endpoint (/metrics) för hela processen som visar live-värden för den körning som optimeras just nu.
+
+    Flera filer kan vara igång samtidigt i pipelinen men porten kan bara bindas en gång, så servern startas
+    en gång och pekas om till rätt RunMetrics med show().
+    """
+    def __init__(self, port, host="127.0.0.1"):
+        self.current = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                metrics = server.current
+                body = (metrics.prometheus_text() if metrics else "").encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.http_server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+
+    def show(self, metrics):
+        """Visa mätvärdena för en annan körning."""
+        self.current = metrics
+
+    def stop(self):
+        self.http_server.shutdown()
+        self.http_server.server_close()
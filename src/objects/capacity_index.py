@@ -0,0 +1,126 @@
+import copy
+import numpy as np
+
+class CapacityIndex:
+    """Index över paket som svarar på "vilket tillgängligt paket med högst förtjänst ryms i X viktenheter"."""
+    def __init__(self, weight_units, values, available=None):
+        self.weight_units = np.asarray(weight_units, dtype=np.int64)
+        self.values = np.asarray(values, dtype=float)
+
+        # En hink per viktenhet (0.1 kg), inom hinken sorterat på förtjänst i fallande ordning
+        self.order = np.lexsort((-self.values, self.weight_units))
+        self.position = np.empty(len(self.order), dtype=np.int64)
+        self.position[self.order] = np.arange(len(self.order))
+        self.num_buckets = int(self.weight_units.max()) + 1 if len(self.weight_units) else 1
+        sorted_units = self.weight_units[self.order]
+        self.bucket_start = np.searchsorted(sorted_units, np.arange(self.num_buckets + 1))
+        self.sorted_values = self.values[self.order].tolist()
+        self.order_list = self.order.tolist()
+        self.size = 1
+        while self.size < self.num_buckets:
+            self.size *= 2
+
+        self._reset(np.ones(len(self.order), dtype=bool) if available is None else available)
+
+    def _reset(self, available):
+        """Bygg om de dynamiska delarna (tillgänglighet, hinkarnas topp och segmentträd)."""
+        available = np.asarray(available, dtype=bool)
+        present_positions = np.flatnonzero(available[self.order])
+        starts, ends = self.bucket_start[:-1], self.bucket_start[1:]
+        lookup = np.searchsorted(present_positions, starts)
+        if len(present_positions):
+            heads = present_positions[np.minimum(lookup, len(present_positions) - 1)]
+            heads = np.where((lookup < len(present_positions)) & (heads < ends), heads, ends)
+        else:
+            heads = ends.copy()
+
+        leaves = np.full(self.size, -np.inf)
+        has_head = heads < ends
+        leaves[:self.num_buckets][has_head] = self.values[self.order[heads[has_head]]]
+        tree = np.full(2 * self.size, -np.inf)
+        tree[self.size:] = leaves
+        level = self.size
+        while level > 1:
+            tree[level // 2:level] = np.maximum(tree[level:2 * level:2], tree[level + 1:2 * level:2])
+            level //= 2
+
+        self.present = available.tolist()
+        self.count = int(available.sum())
+        self.heads = heads.tolist()
+        self.ends = ends.tolist()
+        self.tree = tree.tolist()
+
+    def subset(self, available):
+        """Nytt index med samma paketordning där bara de angivna paketen är tillgängliga."""
+        index = copy.copy(self)
+        index._reset(available)
+        return index
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, package_index):
+        return self.present[package_index]
+
+    def _update_bucket(self, bucket):
+        """Uppdatera hinkens maxvärde i segmentträdet."""
+        head = self.heads[bucket]
+        node = self.size + bucket
+        self.tree[node] = self.sorted_values[head] if head < self.ends[bucket] else -np.inf
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def remove(self, package_index):
+        """Markera ett paket som tilldelat. Gör inget om paketet redan är borta."""
+        if not self.present[package_index]:
+            return
+        self.present[package_index] = False
+        self.count -= 1
+        bucket = int(self.weight_units[package_index])
+        position = int(self.position[package_index])
+        if position == self.heads[bucket]:
+            end = self.ends[bucket]
+            while position < end and not self.present[self.order_list[position]]:
+                position += 1
+            self.heads[bucket] = position
+            self._update_bucket(bucket)
+
+    def insert(self, package_index):
+        """Lägg tillbaka ett paket i lagret."""
+        if self.present[package_index]:
+            return
+        self.present[package_index] = True
+        self.count += 1
+        bucket = int(self.weight_units[package_index])
+        position = int(self.position[package_index])
+        if position < self.heads[bucket]:
+            self.heads[bucket] = position
+            self._update_bucket(bucket)
+
+    def best_fit(self, capacity):
+        """Index för paketet med högst förtjänst som väger högst capacity enheter, None om inget ryms."""
+        last_bucket = min(int(capacity), self.num_buckets - 1)
+        if last_bucket < 0:
+            return None
+
+        best, node = -np.inf, 0
+        left, right = self.size, self.size + last_bucket + 1
+        while left < right:
+            if left & 1:
+                if self.tree[left] > best:
+                    best, node = self.tree[left], left
+                left += 1
+            if right & 1:
+                right -= 1
+                if self.tree[right] > best:
+                    best, node = self.tree[right], right
+            left //= 2
+            right //= 2
+        if not node:
+            return None
+
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] == best else 2 * node + 1
+        return self.order_list[self.heads[node - self.size]]
@@ -0,0 +1,12 @@
+class Individual(list):
+    """En lösning i GA:n: en lista med paket per bil.
+
+    assignment är samma lösning som array med bilindex per paket (-1 = kvar i lager). Den sparas bredvid
+    listorna så att operatorerna inte behöver bygga om den från paketlistorna vid varje anrop,
+    och måste hållas i synk (eller sättas till None) när listorna ändras. key är individual_key för lösningen,
+    None tills den har räknats ut eller efter att listorna har ändrats.
+    """
+    def __init__(self, trucks=(), assignment=None):
+        super().__init__(trucks)
+        self.assignment = assignment
+        self.key = None
@@ -1,3 +1,6 @@
+# Vikterna i lagerfilerna anges med 0.1 kg upplösning
+WEIGHT_UNITS_PER_KG = 10
+
 class Package:
     def __init__(self, package_id:int, weight:float, profit:int, deadline:int):
         self.id = package_id
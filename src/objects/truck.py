@@ -1,3 +1,6 @@
+# Marginal för flyttalsfel när summan av vikterna hamnar exakt på kapaciteten
+CAPACITY_TOLERANCE = 1e-9
+
 class Truck:
     def __init__(self, truck_id:int, max_capacity:int=800):
         self.id = truck_id
@@ -6,7 +9,7 @@ class Truck:
 
     def add_package(self, package):
         """Lägg till ett paket om det finns plats."""
-        if self.get_total_weight() + package.weight <= self.max_capacity:
+        if self.get_total_weight() + package.weight <= self.max_capacity + CAPACITY_TOLERANCE:
             self.packages.append(package)
             return True
         return False
@@ -22,7 +25,7 @@ class Truck:
     
     def can_fit(self, package):
         """Kontrollera om ett paket kan passa i bilen utan att överskrida kapaciteten."""
-        return self.get_total_weight() + package.weight <= self.max_capacity
+        return self.get_total_weight() + package.weight <= self.max_capacity + CAPACITY_TOLERANCE
 
     def prioritize_packages(self):
         """Prioritera vilka paket som ska behållas baserat på profit/vikt."""
@@ -1,17 +1,27 @@
 import random
+import heapq
+import itertools
 import matplotlib.pyplot as plt
 import numpy as np
 from src.objects.truck import Truck
-from src.objects.package import Package
+from src.objects.package import Package, WEIGHT_UNITS_PER_KG
+from src.objects.capacity_index import CapacityIndex
+from src.objects.individual import Individual
 from src.visualization import visualize_histogram, visualize_fitness
 import os
 import sys
 import time
+import json
+import hashlib
+import threading
+from contextlib import nullcontext
 
 base_dir = os.path.abspath(".") 
 sys.path.append(base_dir)  
 log_file = os.path.join(base_dir, "logs", "optimization.log")
 save_file = os.path.join(base_dir, "results", "solution.txt")
+# Antal kandidater som jämförs åt gången när repair fyller resten av en bil
+REPAIR_SCAN_BLOCK = 256
 
 class Optimizer:
     """Min genetiska algoritm optimizer klass för att maximera förtjänst."""
@@ -22,6 +32,24 @@ class Optimizer:
         self.log_file = log_file or os.path.join(os.getcwd(), "logs", "optimization.log")
         os.makedirs(os.path.dirname(self.log_file), exist_ok=True)  
 
+        # Kolumner över pakettabellen så att operatorerna kan jobba med masker istället för mängder
+        self.package_index = {p: i for i, p in enumerate(self.packages)}
+        self.package_array = np.empty(len(self.packages), dtype=object)
+        self.package_array[:] = self.packages
+        self.weights = np.array([p.weight for p in self.packages], dtype=float)
+        self.values = np.array([p.effective_profit() for p in self.packages], dtype=float)
+        self.weight_units = np.ceil(self.weights * WEIGHT_UNITS_PER_KG - 1e-9).astype(np.int64)
+        self.capacity_units = int(np.floor(self.max_capacity * WEIGHT_UNITS_PER_KG + 1e-9))
+        # Två index över samma paket: högst förtjänst för byten, högst förtjänst per kg för påfyllning
+        self.capacity_index = CapacityIndex(self.weight_units, self.values, available=self.values > 0)
+        self.density_index = CapacityIndex(self.weight_units, self.values / self.weights, available=self.values > 0)
+        # Lönsamma paket i fallande förtjänst per kg och det tyngsta av dem, för repair
+        profitable = np.flatnonzero(self.values > 0)
+        self.density_order = profitable[np.argsort(-(self.values / self.weights)[profitable], kind="stable")]
+        self.max_weight_units = int(self.weight_units[profitable].max()) if len(profitable) else 0
+        self.evaluations = 0
+        self.fitness_cache = {}
+
     def calculate_total_profit(self):
         """Räkna ut total förtjänst från alla bilar."""
         return sum(truck.get_total_profit() for truck in self.trucks)
@@ -34,26 +62,31 @@ class Optimizer:
         """Skapar en initial population med en hel del slumpmässighet."""
         population = []
         for _ in range(population_size):
-            solution = []
-            available_packages = self.packages[:]
-            random.shuffle(available_packages) 
-            for _ in range(self.max_trucks):
-                truck = []
-                weight = 0
+            assignment = np.full(len(self.packages), -1, dtype=np.int64)
+            index = self.density_index.subset(self.values > 0)
+            available_packages = list(range(len(self.packages)))
+            random.shuffle(available_packages)
+            for truck_index in range(self.max_trucks):
+                free = self.capacity_units
                 while available_packages:
-                    package = random.choice(available_packages) 
-                    if weight + package.weight <= self.max_capacity:
-                        truck.append(package)
-                        weight += package.weight
-                        available_packages.remove(package)
+                    i = available_packages.pop()
+                    if assignment[i] >= 0:
+                        continue
+                    if self.weight_units[i] <= free:
+                        assignment[i] = truck_index
+                        free -= self.weight_units[i]
+                        index.remove(i)
                     else:
+                        available_packages.append(i)
                         break
-                solution.append(truck)
-            population.append(solution)
+                # Fyll resten av bilen med de bästa paketen som fortfarande ryms
+                self._fill_truck(assignment, truck_index, free, index)
+            population.append(self.to_individual(assignment))
         return population
 
     def fitness(self, individual):
-        """Beräknar fitness med en diversitetskomponent."""
+        """Beräknar fitness: förtjänst för levererade paket minus straffavgifter för paket kvar i lager."""
+        self.evaluations += 1
         total_profit = sum(
             sum(p.profit for p in truck_packages) for truck_packages in individual
         )
@@ -61,9 +94,69 @@ class Optimizer:
         remaining_packages = set(self.packages) - set(delivered_packages)
         total_penalty = sum(p.calculate_penalty() for p in remaining_packages)
 
-        diversity_score = len(set(delivered_packages)) / len(delivered_packages) if delivered_packages else 0
-
-        return (total_profit - total_penalty + 0.1 * diversity_score)
+        return total_profit - total_penalty
+
+    def individual_key(self, assignment):
+        """Kanonisk nyckel för en lösning: bilarna numreras efter sitt lägsta paketindex och ordningen i bilen ignoreras."""
+        assigned = np.flatnonzero(assignment >= 0)
+        trucks, first = np.unique(assignment[assigned], return_index=True)
+        lowest = np.full(self.max_trucks, len(self.packages), dtype=np.int64)
+        lowest[trucks] = assigned[first]
+        rank = np.empty(self.max_trucks, dtype=np.int64)
+        rank[np.argsort(lowest, kind="stable")] = np.arange(self.max_trucks)
+        canonical = np.where(assignment >= 0, rank[assignment], -1)
+        return hashlib.blake2b(canonical.astype(np.int16).tobytes(), digest_size=16).digest()
+
+    def key_of(self, individual):
+        """individual_key för en lösning, sparas på en Individual så att den bara räknas ut en gång."""
+        key = getattr(individual, "key", None)
+        if key is None:
+            key = self.individual_key(self.assignment(individual))
+            if isinstance(individual, Individual):
+                individual.key = key
+        return key
+
+    def cached_fitness(self, individual):
+        """Fitness sparad per individual_key, samma lösning evalueras inte igen (turneringar, elit, statistik)."""
+        key = self.key_of(individual)
+        fitness = self.fitness_cache.get(key)
+        if fitness is None:
+            fitness = self.fitness_cache[key] = self.fitness(individual)
+        return fitness
+
+    def diversity(self, delivered):
+        """Genomsnittligt parvis avstånd mellan populationens levererade paketmängder, 0 = alla lika, 1 = helt olika.
+
+        delivered är en (individer x paket) boolesk matris. Avståndet är storleken på den symmetriska
+        differensen, normerad med dubbla medelstorleken på mängderna.
+        """
+        size = len(delivered)
+        if size < 2:
+            return 0.0
+        frequency = delivered.mean(axis=0)
+        mean_distance = 2 * (frequency * (1 - frequency)).sum() * size / (size - 1)
+        mean_size = delivered.sum(axis=1).mean()
+        return float(mean_distance / (2 * mean_size)) if mean_size else 0.0
+
+    def deduplicate(self, population):
+        """Ta bort dubbletter ur populationen och ersätt dem med nya slumpade individer (immigranter).
+
+        Returnerar (population, diversitet, antal dubbletter)."""
+        seen = set()
+        unique, delivered = [], []
+        for individual in population:
+            key = self.key_of(individual)
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(individual)
+            delivered.append(self.assignment(individual) >= 0)
+
+        duplicates = len(population) - len(unique)
+        for immigrant in self.initialize_population(duplicates):
+            unique.append(immigrant)
+            delivered.append(self.assignment(immigrant) >= 0)
+        return unique, self.diversity(np.array(delivered)), duplicates
 
     def select_parents(self, population):
         """Välj föräldrar med turneringsmetod för lägre selektionspress."""
@@ -71,39 +164,152 @@ class Optimizer:
         parents = []
         for _ in range(len(population) // 2):
             candidates = random.sample(population, tournament_size)
-            parent = max(candidates, key=self.fitness)
+            parent = max(candidates, key=self.cached_fitness)
             parents.append(parent)
         return parents
 
+    def assignment(self, individual):
+        """Översätt en lösning till en array med bilindex per paket, -1 betyder kvar i lager.
+
+        För en Individual används den sparade arrayen (som kopia, anroparna får ändra i den)."""
+        if getattr(individual, "assignment", None) is not None:
+            return individual.assignment.copy()
+        assignment = np.full(len(self.packages), -1, dtype=np.int64)
+        for truck_index, truck_packages in enumerate(individual):
+            indices = [self.package_index[p] for p in truck_packages]
+            assignment[indices] = truck_index
+        return assignment
+
+    def to_individual(self, assignment):
+        """Bygg en lösning (lista av paketlistor per bil) från en array med bilindex."""
+        indices = np.flatnonzero(assignment >= 0)
+        indices = indices[np.argsort(assignment[indices], kind="stable")]
+        counts = np.bincount(assignment[indices], minlength=self.max_trucks)
+        parts = np.split(self.package_array[indices], np.cumsum(counts)[:-1])
+        return Individual([part.tolist() for part in parts], assignment.copy())
+
+    def leftover_index(self, assignment, density=False):
+        """Kapacitetsindex över lönsamma paket som ligger kvar i lager för en lösning."""
+        index = self.density_index if density else self.capacity_index
+        return index.subset((assignment < 0) & (self.values > 0))
+
+    def _fill_truck(self, assignment, truck_index, free, index):
+        """Fyll en bil med det bästa paketet enligt indexet som ryms tills inget mer får plats."""
+        while True:
+            i = index.best_fit(free)
+            if i is None:
+                return free
+            assignment[i] = truck_index
+            free -= self.weight_units[i]
+            index.remove(i)
+
+    def truck_loads(self, assignment):
+        """Lastad vikt per bil i viktenheter."""
+        assigned = assignment >= 0
+        load = np.bincount(assignment[assigned], weights=self.weight_units[assigned], minlength=self.max_trucks)
+        return load.astype(np.int64)
+
+    def repair(self, assignment):
+        """Fyll girigt bilarnas lediga kapacitet med de bästa paketen som är kvar i lager.
+
+        Så länge en bil har plats för det tyngsta paketet är det bästa valet alltid nästa paket i density_order,
+        så den delen tas som ett prefix med cumsum. Resten av varje bil fylls från de kandidater som är kvar
+        i samma ordning: det första paketet som ryms är det med högst förtjänst per kg som ryms.
+        """
+        remaining = self.capacity_units - self.truck_loads(assignment)
+        candidates = self.density_order[assignment[self.density_order] < 0]
+        cumulative = np.cumsum(self.weight_units[candidates])
+        taken, used = 0, 0
+        for truck_index in range(self.max_trucks):
+            limit = remaining[truck_index] - self.max_weight_units
+            end = int(np.searchsorted(cumulative, used + limit, side="right")) if limit > 0 else taken
+            if end > taken:
+                assignment[candidates[taken:end]] = truck_index
+                remaining[truck_index] -= cumulative[end - 1] - used
+                taken, used = end, int(cumulative[end - 1])
+
+        tail = candidates[taken:]
+        tail_units = self.weight_units[tail]
+        lightest = int(tail_units.min()) if len(tail) else 0
+        for truck_index in range(self.max_trucks):
+            free, position = int(remaining[truck_index]), 0
+            # Lättare paket före position rymdes inte tidigare och ryms inte nu heller, så sökningen
+            # fortsätter framåt i block istället för att jämföra hela resten av listan för varje paket
+            while position < len(tail) and free >= lightest:
+                fits = tail_units[position:position + REPAIR_SCAN_BLOCK] <= free
+                if not fits.any():
+                    position += REPAIR_SCAN_BLOCK
+                    continue
+                j = position + int(fits.argmax())
+                assignment[tail[j]] = truck_index
+                free -= int(tail_units[j])
+                # Ett taget paket räknas som för tungt för resten av bilarna
+                tail_units[j] = self.capacity_units + 1
+                position = j + 1
+        return assignment
+
     def crossover(self, parent1, parent2):
-        """Kombinerar föräldrar och säkerställer att paket inte dupliceras."""
-        child1, child2 = [], []
-        used_packages_child1 = set()
-        used_packages_child2 = set()
-
-        for truck1, truck2 in zip(parent1, parent2):
-            combined = truck1 + truck2  
-            random.shuffle(combined) 
-
-            truck_child1, truck_child2 = [], []
-            weight1, weight2 = 0, 0
-
-            for package in combined:
-                if package in used_packages_child1 or package in used_packages_child2:
-                    continue  
-                if weight1 + package.weight <= self.max_capacity:
-                    truck_child1.append(package)
-                    weight1 += package.weight
-                    used_packages_child1.add(package)
-                elif weight2 + package.weight <= self.max_capacity:
-                    truck_child2.append(package)
-                    weight2 += package.weight
-                    used_packages_child2.add(package)
-
-            child1.append(truck_child1)
-            child2.append(truck_child2)
-
-        return child1, child2
+        """Mask-baserad crossover: varje bil ärvs hel från en förälder, sedan repareras barnen girigt."""
+        assignment1 = self.assignment(parent1)
+        assignment2 = self.assignment(parent2)
+        mask = np.array([random.random() < 0.5 for _ in range(self.max_trucks)], dtype=bool)
+
+        # Uppslag per bilindex, sista platsen (index -1) är paket i lager
+        from_primary, from_secondary = np.append(mask, False), np.append(~mask, False)
+        children = []
+        for primary, secondary in ((assignment1, assignment2), (assignment2, assignment1)):
+            # Paket från bilar som ärvs från primary vinner över samma paket hos secondary
+            child = np.where(from_primary[primary], primary, np.where(from_secondary[secondary], secondary, -1))
+            children.append(self.to_individual(self.repair(child)))
+
+        return children[0], children[1]
+
+    def local_search(self, individual, max_moves=200):
+        """Memetisk lokalsökning: byt paket i bilarna mot bättre paket i lager (1-mot-1 och 1-mot-2)."""
+        assignment = self.assignment(individual)
+        remaining = (self.capacity_units - self.truck_loads(assignment)).tolist()
+        index = self.leftover_index(assignment)
+
+        moves = 0
+        improved = True
+        while improved and moves < max_moves:
+            improved = False
+            delivered = np.flatnonzero(assignment >= 0)
+            delivered = delivered[np.argsort(self.values[delivered], kind="stable")]
+            for i in delivered.tolist():
+                truck_index = assignment[i]
+                freed = remaining[truck_index] + self.weight_units[i]
+                first = index.best_fit(freed)
+                if first is None:
+                    continue
+
+                swap_in, gain = [first], self.values[first] - self.values[i]
+                index.remove(first)
+                second = index.best_fit(freed - self.weight_units[first])
+                if second is not None:
+                    pair_gain = self.values[first] + self.values[second] - self.values[i]
+                    if pair_gain > gain:
+                        swap_in, gain = [first, second], pair_gain
+                index.insert(first)
+
+                if gain <= 0:
+                    continue
+
+                assignment[i] = -1
+                remaining[truck_index] = freed
+                for j in swap_in:
+                    assignment[j] = truck_index
+                    remaining[truck_index] -= self.weight_units[j]
+                    index.remove(j)
+                if self.values[i] > 0:
+                    index.insert(i)
+
+                moves += 1
+                improved = True
+                if moves >= max_moves:
+                    break
+
+        return self.to_individual(self.repair(assignment))
 
     def mutate(self, individual, mutation_rate):
         """Muterar en lösning för att öka variationen."""
@@ -111,43 +317,132 @@ class Optimizer:
             truck1, truck2 = random.sample(range(len(individual)), 2)
             if individual[truck1] and individual[truck2]:
                 package = individual[truck1].pop(random.randint(0, len(individual[truck1]) - 1))
-                if sum(p.weight for p in individual[truck2]) + package.weight <= self.max_capacity:
+                if isinstance(individual, Individual):
+                    individual.key = None
+                truck2_units = sum(self.weight_units[self.package_index[p]] for p in individual[truck2])
+                if truck2_units + self.weight_units[self.package_index[package]] <= self.capacity_units:
                     individual[truck2].append(package)
+                    if getattr(individual, "assignment", None) is not None:
+                        individual.assignment[self.package_index[package]] = truck2
                 else:
-                    individual[truck1].append(package)
+                    # Paketet ryms inte: det lämnas i lager och bilen fylls med det bästa som ryms istället
+                    if getattr(individual, "assignment", None) is not None:
+                        individual.assignment[self.package_index[package]] = -1
+                    assignment = self.assignment(individual)
+                    index = self.leftover_index(assignment, density=True)
+                    index.remove(self.package_index[package])
+                    free = self.capacity_units - self.truck_loads(assignment)[truck1]
+                    before = assignment.copy()
+                    self._fill_truck(assignment, truck1, int(free), index)
+                    individual[truck1].extend(self.packages[i] for i in np.flatnonzero(assignment != before).tolist())
+                    if getattr(individual, "assignment", None) is not None:
+                        individual.assignment = assignment
         for truck_packages in individual:
             if random.random() < mutation_rate:
                 random.shuffle(truck_packages)
 
     def optimize(self, population_size=10, generations=50, 
                 initial_mutation_rate=0.05, patience=5, mutation_increase=0.05, 
-                run_id=None, log_window=None):
-        """Genetisk algoritm med elitism och stoppkriterium för stagnation och dynamisk mutation."""
+                run_id=None, log_window=None, local_search=False, elite_size=2,
+                time_limit=None, on_improvement=None,
+                checkpoint_file=None, checkpoint_every=10, resume=False, profiler=None, metrics=None):
+        """Genetisk algoritm med elitism och stoppkriterium för stagnation och dynamisk mutation.
+
+        Med time_limit (sekunder) avbryts körningen efter den generation där tiden tar slut och den bästa
+        lösningen hittills returneras. on_improvement(generation, fitness, solution) anropas varje gång
+        en bättre lösning hittas, och current_best() kan hämta den från en annan tråd under körningen.
+
+        Med checkpoint_file sparas GA-tillståndet var checkpoint_every generation i en bakgrundstråd,
+        och med resume=True fortsätter körningen från den checkpointen om den finns.
+        Med en MemoryProfiler mäts minnet runt varje GA-fas, och RunMetrics uppdateras varje generation.
+        """
     
         if run_id is None:
             run_id = random.randint(1, 9999)
+        phase = profiler.phase if profiler else lambda name: nullcontext()
 
-        population = self.initialize_population(population_size)
+        start_time = time.perf_counter()
+        self.evaluations = 0
+        self.fitness_cache = {}
+        self.duplicates_removed = 0
+        self.best_so_far = None
         stats = []
         best_solution = None
         stagnation_counter = 0
         last_best_fitness = None
         mutation_rate = initial_mutation_rate
-
-        for generation in range(generations):
-            population = self.select_parents(population)
-            new_population = population[:2]
-            while len(new_population) < population_size:
-                parent1, parent2 = random.sample(population, 2)
-                child1, child2 = self.crossover(parent1, parent2)
-                self.mutate(child1, mutation_rate)
-                self.mutate(child2, mutation_rate)
-                new_population.extend([child1, child2])
-            population = new_population[:population_size]
-
-            best_fitness = max(self.fitness(ind) for ind in population)
-            mean_fitness = np.mean([self.fitness(ind) for ind in population])
-            stats.append((generation, best_fitness, mean_fitness))
+        first_generation = 0
+
+        checkpoint = None
+        if resume and checkpoint_file and os.path.exists(checkpoint_file):
+            checkpoint = self.load_checkpoint(checkpoint_file)
+            state = checkpoint["state"]
+            if state["package_checksum"] != self.package_checksum():
+                raise ValueError(f"Checkpoint {checkpoint_file} belongs to a different inventory.")
+            if state["generation"] >= generations:
+                # Inget kvar att köra från den checkpointen, körningen börjar om istället
+                if log_window:
+                    log_window.append_log(
+                        f"Ignoring checkpoint at generation {state['generation']} of {generations}, starting over.\n"
+                    )
+                checkpoint = None
+
+        if checkpoint is not None:
+            population = self._decode(checkpoint["population"], checkpoint["population_counts"])
+            if "best" in checkpoint:
+                self.best_so_far = (state["best_fitness"], self._decode(checkpoint["best"], checkpoint["best_counts"])[0])
+            stats = state["stats"]
+            best_fitness, mean_fitness = stats[-1][1], stats[-1][2]
+            stagnation_counter = state["stagnation_counter"]
+            last_best_fitness = state["last_best_fitness"]
+            mutation_rate = state["mutation_rate"]
+            first_generation = state["generation"]
+            random.setstate(state["random_state"])
+            if log_window:
+                log_window.append_log(f"Resuming run {run_id} from generation {first_generation}.\n")
+        else:
+            with phase("initialize_population"):
+                population = self.initialize_population(population_size)
+
+        self._checkpoint_thread = None
+        for generation in range(first_generation, generations):
+            with phase("select_parents"):
+                population = self.select_parents(population)
+            if local_search:
+                # Elitindividerna förbättras med lokalsökning innan de förs vidare
+                with phase("local_search"):
+                    population.sort(key=self.cached_fitness, reverse=True)
+                    for k in range(min(elite_size, len(population))):
+                        population[k] = self.local_search(population[k])
+            with phase("crossover_mutation"):
+                new_population = population[:elite_size]
+                while len(new_population) < population_size:
+                    parent1, parent2 = random.sample(population, 2)
+                    child1, child2 = self.crossover(parent1, parent2)
+                    self.mutate(child1, mutation_rate)
+                    self.mutate(child2, mutation_rate)
+                    new_population.extend([child1, child2])
+                population = new_population[:population_size]
+
+            # Kloner av samma föräldrar slösar evalueringar, de byts mot immigranter
+            with phase("deduplicate"):
+                population, diversity, duplicates = self.deduplicate(population)
+                self.duplicates_removed += duplicates
+
+            with phase("fitness"):
+                fitness_values = [self.cached_fitness(ind) for ind in population]
+                # Bara den nya populationen kan väljas som föräldrar, resten av cachen behövs inte längre
+                self.fitness_cache = {self.key_of(ind): value for ind, value in zip(population, fitness_values)}
+            best_fitness = max(fitness_values)
+            mean_fitness = np.mean(fitness_values)
+            stats.append((generation, best_fitness, mean_fitness, diversity))
+            if metrics:
+                metrics.observe_generation(generation, best_fitness, mean_fitness, self.evaluations)
+
+            if self.best_so_far is None or best_fitness > self.best_so_far[0]:
+                self.best_so_far = (best_fitness, population[fitness_values.index(best_fitness)])
+                if on_improvement:
+                    on_improvement(generation, *self.best_so_far)
 
             self.log_progress(generation, best_fitness, mean_fitness, run_id=run_id, log_window=log_window)
 
@@ -170,7 +465,30 @@ class Optimizer:
                     log_window.append_log(f"Stopping early at generation {generation} due to stagnation.")
                 break
 
-        best_solution = max(population, key=self.fitness)
+            if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+                if log_window:
+                    log_window.append_log(f"Stopping at generation {generation} due to time limit.")
+                break
+
+            # Efter sista generationen finns inget att återuppta, då skrivs ingen checkpoint
+            if checkpoint_file and (generation + 1) % checkpoint_every == 0 and generation + 1 < generations:
+                self.checkpoint(checkpoint_file, population, {
+                    "run_id": run_id,
+                    "generation": generation + 1,
+                    "stats": list(stats),
+                    "stagnation_counter": stagnation_counter,
+                    "last_best_fitness": last_best_fitness,
+                    "mutation_rate": mutation_rate,
+                    "random_state": random.getstate(),
+                })
+
+        if self._checkpoint_thread:
+            self._checkpoint_thread.join()
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            # Körningen är klar, det finns inget att återuppta
+            os.remove(checkpoint_file)
+
+        best_solution = self.best_so_far[1]
         self.apply_solution(best_solution)
 
         self.log_progress(-1, best_fitness, mean_fitness, run_id=run_id, log_window=log_window)
@@ -180,6 +498,198 @@ class Optimizer:
 
         return stats, best_solution
 
+    def optimize_steady_state(self, population_size=10, max_evaluations=5000, children_per_step=2,
+                              initial_mutation_rate=0.05, patience=None, mutation_increase=0.05,
+                              run_id=None, log_window=None, time_limit=None, on_improvement=None,
+                              profiler=None, metrics=None, report_every=None):
+        """Steady-state GA: varje steg skapar några barn som ersätter de sämsta individerna i en heap.
+
+        Bara barnen evalueras, så framsteg, loggning och stagnation räknas i evalueringar. patience och
+        report_every anges i barn (standard 5 respektive 1 populationsstorlek), dubbletter räknas som barn
+        men kostar ingen evaluering. Efter patience barn utan förbättring höjs mutationen och efter dubbelt
+        så många avbryts körningen. Stats har samma form som i optimize med antal evalueringar först.
+        """
+        if run_id is None:
+            run_id = random.randint(1, 9999)
+        phase = profiler.phase if profiler else lambda name: nullcontext()
+        patience = patience or 5 * population_size
+        report_every = report_every or population_size
+        tournament_size = 5
+
+        start_time = time.perf_counter()
+        self.evaluations = 0
+        self.fitness_cache = {}
+        self.duplicates_removed = 0
+        self.best_so_far = None
+        mutation_rate = initial_mutation_rate
+        stats = []
+
+        with phase("initialize_population"):
+            population, _, _ = self.deduplicate(self.initialize_population(population_size))
+
+        # Min-heap på fitness så att den sämsta individen alltid ligger först
+        counter = itertools.count()
+        heap = []
+        with phase("fitness"):
+            for individual in population:
+                heap.append((self.fitness(individual), next(counter), self.key_of(individual), individual))
+        heapq.heapify(heap)
+        keys = {entry[2] for entry in heap}
+        total_fitness = sum(entry[0] for entry in heap)
+        best_entry = max(heap)
+        self.best_so_far = (best_entry[0], best_entry[3])
+
+        def report():
+            delivered = np.array([self.assignment(entry[3]) >= 0 for entry in heap])
+            mean_fitness = total_fitness / len(heap)
+            stats.append((self.evaluations, self.best_so_far[0], mean_fitness, self.diversity(delivered)))
+            self.log_progress(self.evaluations, self.best_so_far[0], mean_fitness, run_id=run_id,
+                              log_window=log_window, unit="Evaluations", first=len(stats) == 1)
+            if metrics:
+                metrics.observe_generation(len(stats) - 1, self.best_so_far[0], mean_fitness, self.evaluations)
+            if log_window:
+                log_window.update_progress(self.evaluations)
+
+        def tournament():
+            return max(random.sample(heap, min(tournament_size, len(heap))), key=lambda entry: entry[0])[3]
+
+        report()
+        next_report = self.evaluations + report_every
+        children_since_improvement = 0
+
+        while self.evaluations < max_evaluations:
+            with phase("crossover_mutation"):
+                children = []
+                while len(children) < children_per_step:
+                    child1, child2 = self.crossover(tournament(), tournament())
+                    self.mutate(child1, mutation_rate)
+                    self.mutate(child2, mutation_rate)
+                    children.extend([child1, child2])
+
+            for child in children[:children_per_step]:
+                children_since_improvement += 1
+                key = self.key_of(child)
+                if key in keys:
+                    self.duplicates_removed += 1
+                    continue
+                with phase("fitness"):
+                    fitness = self.fitness(child)
+                if fitness <= heap[0][0]:
+                    continue
+
+                worst_fitness, _, worst_key, _ = heapq.heapreplace(heap, (fitness, next(counter), key, child))
+                keys.discard(worst_key)
+                keys.add(key)
+                total_fitness += fitness - worst_fitness
+                if fitness > self.best_so_far[0]:
+                    self.best_so_far = (fitness, child)
+                    children_since_improvement = 0
+                    mutation_rate = initial_mutation_rate
+                    if on_improvement:
+                        on_improvement(self.evaluations, fitness, child)
+
+            if self.evaluations >= next_report:
+                report()
+                next_report = self.evaluations + report_every
+
+            if children_since_improvement >= 2 * patience:
+                if log_window:
+                    log_window.append_log(f"Stopping early at evaluation {self.evaluations} due to stagnation.")
+                break
+            if children_since_improvement >= patience and mutation_rate == initial_mutation_rate:
+                mutation_rate += mutation_increase
+
+            if time_limit is not None and time.perf_counter() - start_time >= time_limit:
+                if log_window:
+                    log_window.append_log(f"Stopping at evaluation {self.evaluations} due to time limit.")
+                break
+
+        if stats[-1][0] != self.evaluations:
+            report()
+
+        best_solution = self.best_so_far[1]
+        self.apply_solution(best_solution)
+
+        self.log_progress(-1, stats[-1][1], stats[-1][2], run_id=run_id, log_window=log_window, unit="Evaluations")
+
+        if log_window:
+            log_window.append_log(f"Optimization completed for run_id: {run_id}")
+
+        return stats, best_solution
+
+    def package_checksum(self):
+        """Fingeravtryck av pakettabellen så att en checkpoint bara återupptas mot samma lager."""
+        digest = hashlib.sha1(np.asarray([p.id for p in self.packages]).tobytes())
+        digest.update(self.weights.tobytes())
+        digest.update(self.values.tobytes())
+        return digest.hexdigest()
+
+    def checkpoint(self, checkpoint_file, population, state):
+        """Skriv en checkpoint i en bakgrundstråd. Hoppar över om förra skrivningen inte är klar."""
+        if self._checkpoint_thread and self._checkpoint_thread.is_alive():
+            return
+        population = list(population)
+        state = dict(state, package_checksum=self.package_checksum(), max_trucks=self.max_trucks)
+        best = self.best_so_far
+        self._checkpoint_thread = threading.Thread(
+            target=self._write_checkpoint, args=(checkpoint_file, population, state, best), daemon=True
+        )
+        self._checkpoint_thread.start()
+
+    def _encode(self, individuals):
+        """Packa lösningar som paketindex i listordning plus antal paket per bil."""
+        counts = np.array([[len(truck) for truck in ind] for ind in individuals], dtype=np.int32)
+        flat = np.fromiter(
+            (self.package_index[p] for ind in individuals for truck in ind for p in truck), dtype=np.int32
+        )
+        return flat, counts
+
+    def _decode(self, flat, counts):
+        """Bygg lösningar från _encode, med paketen i samma ordning som när de sparades."""
+        individuals = []
+        position = 0
+        flat = flat.tolist()
+        for row in counts.tolist():
+            individual = []
+            for count in row:
+                individual.append([self.packages[i] for i in flat[position:position + count]])
+                position += count
+            individuals.append(individual)
+        return individuals
+
+    def _write_checkpoint(self, checkpoint_file, population, state, best):
+        """Skriv populationen och tillståndet atomiskt som en komprimerad npz."""
+        flat, counts = self._encode(population)
+        arrays = {"population": flat, "population_counts": counts}
+        if best is not None:
+            state["best_fitness"] = best[0]
+            arrays["best"], arrays["best_counts"] = self._encode([best[1]])
+        # Tillståndet sparas som JSON-text, inte pickle, så att en checkpoint inte kan köra kod när den läses
+        arrays["state"] = np.array(json.dumps(state, default=lambda value: value.item()))
+
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint_file)), exist_ok=True)
+        temp_file = checkpoint_file + ".tmp"
+        with open(temp_file, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temp_file, checkpoint_file)
+
+    @staticmethod
+    def load_checkpoint(checkpoint_file):
+        """Läs en checkpoint: arrayerna som de sparades och state som dict."""
+        with np.load(checkpoint_file, allow_pickle=False) as data:
+            checkpoint = {name: data[name] for name in data.files if name != "state"}
+            state = json.loads(str(data["state"]))
+        # JSON har bara listor, stats-raderna och slumptillståndet ska vara tupler
+        state["stats"] = [tuple(row) for row in state["stats"]]
+        version, internal_state, gauss_next = state["random_state"]
+        state["random_state"] = (version, tuple(internal_state), gauss_next)
+        checkpoint["state"] = state
+        return checkpoint
+
+    def current_best(self):
+        """Bästa (fitness, lösning) hittills i pågående eller senaste körning, None innan första generationen."""
+        return getattr(self, "best_so_far", None)
+
     def apply_solution(self, solution):
         """Använd en lösning och uppdatera optimizer med jämnare fördelning."""
         self.trucks = [Truck(truck_id=f"Truck_{i + 1}", max_capacity=self.max_capacity) for i in range(self.max_trucks)]
@@ -201,15 +711,15 @@ class Optimizer:
         print(f"Totala Straffavgifter: {total_penalty}")
         print(f"Actual total profit: {total_profit + total_penalty}")
 
-    def log_progress(self, generation, best_fitness, mean_fitness, run_id, log_window=None):
+    def log_progress(self, generation, best_fitness, mean_fitness, run_id, log_window=None, unit="Generation", first=None):
         """Loggar progress mellan generationer. Hade andra saker som paket nummer osv men kände att fitness gav tillräcklig info"""
-        if generation == 0:
+        if generation == 0 if first is None else first:
             header = f"\n{'=' * 20} Start of Run {run_id} {'=' * 20}\n"
             with open(self.log_file, "a", encoding="utf-8") as log_file:
                 log_file.write(header)
 
         log_message = (
-            f"Generation: {generation}, "
+            f"{unit}: {generation}, "
             f"Best Fitness: {best_fitness:.2f}, "
             f"Mean Fitness: {mean_fitness:.2f}\n"
         )
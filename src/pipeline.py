@@ -0,0 +1,69 @@
+import time
+import queue
+import threading
+
+_DONE = object()
+
+class StagePipeline:
+    """Kör flera jobb genom en kedja av steg med en tråd per steg och begränsade köer emellan.
+
+    Medan ett jobb är i ett steg kan nästa jobb vara i steget före och föregående i steget efter,
+    t.ex. inläsning av fil k+1 och skrivning av fil k-1 samtidigt som GA:n kör på fil k.
+    Ett steg returnerar jobbet till nästa steg, eller None om resten av stegen ska hoppas över.
+    """
+    def __init__(self, stages, queue_size=1):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.busy = {name: 0.0 for name, _ in stages}
+        self.items = {name: 0 for name, _ in stages}
+        self.elapsed = 0.0
+
+    def _worker(self, name, stage, inbox, outbox):
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                job = stage(job)
+            except Exception as e:
+                print(f"Pipeline stage {name} failed: {e}")
+                job = None
+            self.busy[name] += time.perf_counter() - start
+            self.items[name] += 1
+            if job is not None and outbox is not None:
+                outbox.put(job)
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    def run(self, jobs):
+        """Kör alla jobb genom stegen och vänta tills de är klara. Returnerar utnyttjandet per steg."""
+        start = time.perf_counter()
+        # Första kön matas av den här tråden, köerna mellan stegen är begränsade så att högst
+        # queue_size jobb ligger färdiga och väntar (och tar minne) före varje steg
+        queues = [queue.Queue()] + [queue.Queue(maxsize=self.queue_size) for _ in self.stages[1:]] + [None]
+        threads = [
+            threading.Thread(target=self._worker, args=(name, stage, queues[i], queues[i + 1]), daemon=True)
+            for i, (name, stage) in enumerate(self.stages)
+        ]
+        for thread in threads:
+            thread.start()
+        for job in jobs:
+            queues[0].put(job)
+        queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        return self.utilization()
+
+    def utilization(self):
+        """Andel av den totala tiden som varje steg har arbetat."""
+        return {name: busy / self.elapsed if self.elapsed > 0 else 0.0 for name, busy in self.busy.items()}
+
+    def summary_lines(self):
+        """Rader med tid och utnyttjande per steg."""
+        lines = [f"Pipeline total time: {self.elapsed:.2f} s"]
+        utilization = self.utilization()
+        for name, _ in self.stages:
+            lines.append(f"  {name}: {self.items[name]} jobs, busy {self.busy[name]:.2f} s ({utilization[name]:.0%})")
+        return lines
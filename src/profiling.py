@@ -0,0 +1,113 @@
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # resource finns inte på Windows, då rapporteras bara tracemalloc
+    resource = None
+
+# tracemalloc och dess toppvärde gäller hela processen, så bara en profilerare i taget får mäta.
+# En andra profilerare väntar i start() tills den första har stoppat
+_profiling_lock = threading.Lock()
+
+def peak_rss_mb():
+    """Högsta RSS för processen i MB, None om det inte går att läsa på plattformen."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss är i kB på Linux men i bytes på macOS
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+class MemoryProfiler:
+    """Valfri minnesmätning med tracemalloc runt faserna i en körning (load_data, GA-faserna osv.).
+
+    Bara en körning i taget kan mätas, stop() måste anropas även när körningen misslyckas.
+    """
+    def __init__(self, top=10, snapshot_calls=1):
+        self.top = top
+        self.snapshot_calls = snapshot_calls
+        self.phases = {}
+        self.active = False
+        self.started_tracing = False
+
+    def start(self):
+        """Börja mäta, väntar om en annan profilerare redan mäter."""
+        if self.active:
+            return
+        _profiling_lock.acquire()
+        self.active = True
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def stop(self):
+        """Sluta mäta och släpp spärren. Spårning som startats av någon annan lämnas på."""
+        if not self.active:
+            return
+        if self.started_tracing:
+            tracemalloc.stop()
+        self.active = False
+        _profiling_lock.release()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    @contextmanager
+    def phase(self, name):
+        """Mät toppminne och nettoallokering för ett block.
+
+        En snapshot tar lång tid med många objekt i minnet, så allokeringsställena (skillnaden mellan
+        snapshots före och efter) tas bara för de första snapshot_calls anropen av varje fas.
+        """
+        self.start()
+        record = self.phases.setdefault(name, {"calls": 0, "peak": 0, "net": 0, "sites": []})
+        before_snapshot = self._snapshot() if record["calls"] < self.snapshot_calls else None
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            record["calls"] += 1
+            record["net"] += after - before
+            worst = peak - before > record["peak"]
+            record["peak"] = max(record["peak"], peak - before)
+            if before_snapshot is not None and (worst or not record["sites"]):
+                differences = self._snapshot().compare_to(before_snapshot, "lineno")
+                record["sites"] = [str(stat) for stat in differences[:self.top]]
+
+    def peak_traced_mb(self):
+        """Största toppminnet (över startnivån) bland faserna i MB."""
+        return max((record["peak"] for record in self.phases.values()), default=0) / (1024 * 1024)
+
+    def summary_lines(self):
+        """Rader med toppminne till _results.txt."""
+        rss = peak_rss_mb()
+        lines = [f"Toppminne (tracemalloc, största fas): {self.peak_traced_mb():.1f} MB"]
+        if rss is not None:
+            lines.append(f"Toppminne (RSS): {rss:.1f} MB")
+        return lines
+
+    def write_report(self, result_dir, file_name="memory_profile.txt"):
+        """Skriv en rapport med alla faser och deras största allokeringsställen till resultatmappen."""
+        os.makedirs(result_dir, exist_ok=True)
+        report_file = os.path.join(result_dir, file_name)
+        with open(report_file, "w", encoding="utf-8") as file:
+            for line in self.summary_lines():
+                file.write(line + "\n")
+            for name, record in self.phases.items():
+                file.write(f"\n--- {name} ---\n")
+                file.write(f"Calls: {record['calls']}\n")
+                file.write(f"Peak above start: {record['peak'] / (1024 * 1024):.2f} MB\n")
+                file.write(f"Net allocated: {record['net'] / (1024 * 1024):.2f} MB\n")
+                file.write("Top allocation sites (first calls):\n")
+                for site in record["sites"]:
+                    file.write(f"  {site}\n")
+        print(f"Memory profile saved: {report_file}")
+        return report_file
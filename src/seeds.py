@@ -1,33 +1,59 @@
-import csv
-import random
 from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.shared_data import PACKAGE_DTYPE
 
-def seed_packages(n_iter: int = 100, target_path: Path = Path('data/lagerstatus.csv')) -> None:
-    """En seeder för att skapa mina egna filer med data. SNODD AV DANIEL"""
+# Vikten för varje möjlig summa av de två tärningarna (20-230). Pythons round() på s / 20 avrundar
+# inte likadant som np.round, så tabellen ger exakt samma vikter som den gamla seedern
+WEIGHT_LOOKUP = np.array([round(s / 20, 1) for s in range(231)])
+
+def seed_packages(n_iter: int = 100, target_path: Path = Path('data/lagerstatus.csv'), seed: int = None,
+                  chunk_size: int = 1_000_000, binary_path: Path = None) -> None:
+    """En seeder för att skapa mina egna filer med data. SNODD AV DANIEL
+
+    Paketen slumpas med NumPy i block om chunk_size rader och varje block skrivs direkt till fil,
+    så minnesanvändningen är konstant även för tiotals miljoner rader. Samma seed ger samma fil oavsett
+    chunk_size, eftersom varje dragning har en egen slumpström.
+    Med binary_path skrivs samma paket även som en .npy med PACKAGE_DTYPE (kan läsas med mmap).
+    """
     assert 0 < n_iter, 'n_iter needs to be a positive integer'
     assert n_iter < 9_000_000_000, 'n_iter needs to be less than 9 billion'
 
-    entries = []
-    id_num = random.randint(1_000_000_000, 9_999_999_999 - n_iter)
-    for _ in range(n_iter):
-        id_num += 1
-        weight = round((random.randint(10, 150) + random.randint(10, 80)) / 20, 1)
-        profit = int((random.randint(1, 10) + random.randint(1, 10)) / 2)
-        deadline = int((random.randint(-1, 7) + random.randint(-3, 3)) / 2)
-        entries.append(
-            {
-                'Paket_id': id_num,
+    rng = np.random.default_rng(seed)
+    first_id = int(rng.integers(1_000_000_000, 9_999_999_999 - n_iter, endpoint=True)) + 1
+    weight_a, weight_b, profit_a, profit_b, deadline_a, deadline_b = rng.spawn(6)
+
+    binary = None
+    if binary_path is not None:
+        binary = np.lib.format.open_memmap(Path(binary_path), mode='w+', dtype=PACKAGE_DTYPE, shape=(n_iter,))
+
+    with Path(target_path).open('w', encoding='utf-8') as file:
+        for start in range(0, n_iter, chunk_size):
+            size = min(chunk_size, n_iter - start)
+            ids = np.arange(first_id + start, first_id + start + size, dtype=np.int64)
+            # Samma fördelningar som den gamla seedern med random.randint (övre gränsen är inklusiv där)
+            weight = WEIGHT_LOOKUP[weight_a.integers(10, 150, size, endpoint=True) + weight_b.integers(10, 80, size, endpoint=True)]
+            profit = (profit_a.integers(1, 10, size, endpoint=True) + profit_b.integers(1, 10, size, endpoint=True)) // 2
+            deadline = np.trunc((deadline_a.integers(-1, 7, size, endpoint=True) + deadline_b.integers(-3, 3, size, endpoint=True)) / 2).astype(np.int64)
+
+            pd.DataFrame({
+                'Paket_id': ids,
                 'Vikt': weight,
                 'Förtjänst': profit,
-                'Deadline': deadline
-            }
-        )
+                'Deadline': deadline,
+            }).to_csv(file, header=start == 0, index=False, lineterminator='\n')
+
+            if binary is not None:
+                block = binary[start:start + size]
+                block['id'] = ids
+                block['weight'] = weight
+                block['profit'] = profit
+                block['deadline'] = deadline
+                block['penalty'] = np.where(deadline < 0, -(deadline ** 2), 0)
 
-    fieldnames = 'Paket_id','Vikt','Förtjänst','Deadline'
-    with target_path.open('w', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames, lineterminator='\n')
-        writer.writeheader()
-        writer.writerows(entries)
+    if binary is not None:
+        binary.flush()
+        del binary
 
 if __name__ == '__main__':
-    seed_packages()
\ No newline at end of file
+    seed_packages()
@@ -0,0 +1,98 @@
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+from src.objects.package import Package
+
+# Kolumnerna som delas mellan processer, straffavgiften är härledd från deadline
+PACKAGE_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("weight", np.float64),
+    ("profit", np.int64),
+    ("deadline", np.int64),
+    ("penalty", np.int64),
+])
+
+def package_columns(packages):
+    """Bygg en kolumntabell (strukturerad array) från en lista av Package objekt."""
+    table = np.empty(len(packages), dtype=PACKAGE_DTYPE)
+    table["id"] = [p.id for p in packages]
+    table["weight"] = [p.weight for p in packages]
+    table["profit"] = [p.profit for p in packages]
+    table["deadline"] = [p.deadline for p in packages]
+    table["penalty"] = [p.calculate_penalty() for p in packages]
+    return table
+
+def _release(shm, unlink):
+    """Stäng segmentet och ta bort det om processen äger det."""
+    try:
+        shm.close()
+    except BufferError:
+        # Det finns fortfarande vyer mot minnet, OS:et städar när processen avslutas
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class SharedPackageData:
+    """Paketkolumner i ett delat minnessegment som workers kan koppla upp sig mot via namn utan kopiering.
+
+    Processen som publicerar äger segmentet och tar bort det vid close(), när objektet städas bort
+    eller när tolken avslutas. Dör ägaren hårt städar multiprocessing:s resource tracker upp segmentet.
+    """
+    def __init__(self, shm, length, owner):
+        self.shm = shm
+        self.length = length
+        self.owner = owner
+        self.table = np.ndarray((length,), dtype=PACKAGE_DTYPE, buffer=shm.buf)
+        self._finalizer = weakref.finalize(self, _release, shm, owner)
+
+    @classmethod
+    def publish(cls, packages):
+        """Skriv paketen till ett nytt delat segment. Tar både Package listor och färdiga kolumntabeller."""
+        table = packages if isinstance(packages, np.ndarray) else package_columns(packages)
+        shm = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+        shared = cls(shm, len(table), owner=True)
+        shared.table[:] = table
+        return shared
+
+    @classmethod
+    def attach(cls, handle):
+        """Koppla upp mot ett segment som publicerats av en annan process, handle kommer från .handle."""
+        name, length = handle
+        # Workers delar resource tracker med processen som publicerade, så segmentet tas
+        # inte bort när en worker avslutas, bara när ägaren gör close() eller dör
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, length, owner=False)
+
+    @property
+    def handle(self):
+        """Liten picklebar referens (namn, antal paket) som skickas till workers."""
+        return self.shm.name, self.length
+
+    def column(self, name):
+        """Vy (ingen kopia) över en kolumn, t.ex. "weight"."""
+        return self.table[name]
+
+    def to_packages(self, rows=None):
+        """Bygg Package objekt från kolumnerna, eventuellt bara för vissa rader."""
+        table = self.table if rows is None else self.table[rows]
+        return [
+            Package(package_id, weight, profit, deadline)
+            for package_id, weight, profit, deadline in zip(
+                table["id"].tolist(), table["weight"].tolist(),
+                table["profit"].tolist(), table["deadline"].tolist(),
+            )
+        ]
+
+    def close(self):
+        """Släpp segmentet, ägaren tar även bort det."""
+        self.table = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
@@ -2,9 +2,10 @@ import matplotlib.pyplot as plt
 import os
 import numpy as np
 
-def visualize_fitness(stats, result_dir=None):
-    """Visualisera fitness score över generationer."""
-    generations, best_fitness, mean_fitness = zip(*stats)
+def visualize_fitness(stats, result_dir=None, x_label="Generation"):
+    """Visualisera fitness score över generationer, och diversitet om den finns i stats."""
+    columns = list(zip(*stats))
+    generations, best_fitness, mean_fitness = columns[:3]
 
     plt.figure(figsize=(10, 6))
 
@@ -14,10 +15,18 @@ def visualize_fitness(stats, result_dir=None):
     for gen, best, mean in zip(generations, best_fitness, mean_fitness):
         plt.plot([gen, gen], [mean, best], color="red", linestyle="dotted", linewidth=0.8)
 
-    plt.xlabel("Generation")
+    plt.xlabel(x_label)
     plt.ylabel("Fitness")
-    plt.title("Fitness Evolution Over Generations")
-    plt.legend()
+    plt.title(f"Fitness Evolution Over {x_label}s")
+    plt.legend(loc="upper left")
+
+    if len(columns) > 3:
+        diversity_axis = plt.gca().twinx()
+        diversity_axis.plot(generations, columns[3], label="Diversity", color="gray", linestyle="dashed")
+        diversity_axis.set_ylabel("Diversity")
+        diversity_axis.set_ylim(0, 1)
+        diversity_axis.legend(loc="lower right")
+
     plt.tight_layout()
 
     if result_dir: